@@ -0,0 +1,49 @@
+"""Command line entry point: ``python -m benchmarks``.
+
+Examples::
+
+    python -m benchmarks --keywords 100000 --out bench/current.json
+    python -m benchmarks --baseline bench/baseline.json --threshold 0.15
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from typing import List, Optional
+
+from benchmarks.suite import BENCHMARKS, compare, load_results, run_suite, write_results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--keywords", type=int, default=10_000, help="synthetic keyword count (10k-1M)")
+    parser.add_argument("--years", type=int, default=3, help="date range length for reporting workloads")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run a subset of benchmarks")
+    parser.add_argument("--out", default="bench_output.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="stored results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Mỗi lần export đều ghi log INFO; tắt bớt để bảng kết quả dễ đọc
+    logging.getLogger("reporting.export").setLevel(logging.WARNING)
+    results = run_suite(args.keywords, args.years, args.only)
+    path = write_results(results, args.out)
+    print(f"Wrote {path}")
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for item in regressions:
+            print(
+                f"REGRESSION {item.name}: {item.baseline:.4f} -> {item.current:.4f} "
+                f"({item.change:+.1%})"
+            )
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Offline load test against the local Search Console / GA4 stand-in.
+
+Starts ``integrations.stand_in.StandInServer`` with the requested latency,
+error and quota profile, then drives several ``KeywordCrawler`` workers
+(sharing one ``CrawlerController`` and ``Database``) and concurrent
+``ReportingPipeline.generate`` calls through the HTTP clients::
+
+    python -m benchmarks.load_test --keywords 1000000 --workers 64 \\
+        --latency lognormal:40:0.5 --error-429 0.01 --error-5xx 0.005
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from threading import Lock
+from typing import Dict, Iterator, List, Optional
+
+from benchmarks.workloads import PROPERTY_ID, SITE_URL, iter_keywords
+from crawler.bot import CrawlerController, KeywordCrawler
+from integrations.http_clients import HttpGA4Client, HttpSearchConsoleClient
+from integrations.stand_in import LatencyModel, StandInConfig, StandInServer
+from reporting.pipeline import ReportingPipeline
+from storage.database import Database
+
+
+class _SharedIterator:
+    """Thread-safe view over one iterator so workers split the keyword stream."""
+
+    def __init__(self, source: Iterator[str]) -> None:
+        self._source = source
+        self._lock = Lock()
+
+    def __iter__(self) -> "_SharedIterator":
+        return self
+
+    def __next__(self) -> str:
+        with self._lock:
+            return next(self._source)
+
+
+def run_load_test(
+    keywords: int,
+    workers: int,
+    config: StandInConfig,
+    rate_limit_per_minute: int = 10**9,
+    reports: int = 0,
+    report_days: int = 365,
+) -> Dict[str, object]:
+    db = Database()
+    controller = CrawlerController(rate_limit_per_minute)
+    shared = _SharedIterator(iter_keywords(keywords))
+    with StandInServer(config) as server:
+
+        def crawl_worker() -> int:
+            client = HttpSearchConsoleClient(SITE_URL, server.base_url)
+            return sum(1 for _ in KeywordCrawler(client, db, controller).iter_crawl(shared))
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            crawled = sum(pool.map(lambda _: crawl_worker(), range(workers)))
+        crawl_elapsed = time.perf_counter() - began
+
+        report_elapsed = 0.0
+        if reports:
+
+            def report_worker(index: int) -> None:
+                pipeline = ReportingPipeline(
+                    HttpGA4Client(PROPERTY_ID, server.base_url, page_size=100),
+                    HttpSearchConsoleClient(SITE_URL, server.base_url, page_size=100),
+                    db,
+                )
+                end = date(2024, 12, 31) - timedelta(days=index)
+                pipeline.generate(end - timedelta(days=report_days - 1), end)
+
+            began = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(report_worker, range(reports)))
+            report_elapsed = time.perf_counter() - began
+        server_stats = dict(server.stats)
+    db.close()
+    return {
+        "keywords_requested": keywords,
+        "keywords_crawled": crawled,
+        "crawl_seconds": round(crawl_elapsed, 3),
+        "crawl_keywords_per_s": round(crawled / crawl_elapsed, 1) if crawl_elapsed else None,
+        "reports": reports,
+        "reports_per_s": round(reports / report_elapsed, 2) if report_elapsed else None,
+        "server": server_stats,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test", description=__doc__.splitlines()[0])
+    parser.add_argument("--keywords", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--rate-limit", type=int, default=10**9, help="CrawlerController requests per minute")
+    parser.add_argument("--reports", type=int, default=0, help="concurrent ReportingPipeline.generate calls")
+    parser.add_argument("--report-days", type=int, default=365)
+    parser.add_argument("--latency", default="lognormal:40:0.5", help="kind:a[:b] in milliseconds")
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-5xx", type=float, default=0.0)
+    parser.add_argument("--quota-per-minute", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    config = StandInConfig(
+        latency=LatencyModel.parse(args.latency),
+        error_rate_429=args.error_429,
+        error_rate_5xx=args.error_5xx,
+        quota_per_minute=args.quota_per_minute,
+        seed=args.seed,
+    )
+    result = run_load_test(
+        args.keywords, args.workers, config, args.rate_limit, args.reports, args.report_days
+    )
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
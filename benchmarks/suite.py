@@ -0,0 +1,337 @@
+"""Offline benchmark suite for the crawler, storage, exports and reporting.
+
+Each benchmark returns ``Measurement`` records that are written to JSON
+by ``run_suite``; ``compare`` checks a fresh run against a stored
+baseline and reports every metric that regressed beyond a threshold.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import platform
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from benchmarks.workloads import PROPERTY_ID, SITE_URL, date_range, generate_keywords, iter_rankings
+from crawler.bot import CrawlerController, KeywordCrawler
+from integrations.ga4 import GA4Client
+from integrations.search_console import SearchConsoleClient
+from reporting.export import export_keyword_rankings, export_reports
+from reporting.pipeline import ReportingPipeline
+from storage.database import Database, KeywordRanking
+from storage.rankings import RankingStore
+from storage.segments import SegmentRankingStore
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Measurement:
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool
+
+
+@dataclass
+class Regression:
+    name: str
+    baseline: float
+    current: float
+    change: float
+
+
+def _rate(name: str, count: int, seconds: float) -> Measurement:
+    return Measurement(name, count / seconds if seconds > 0 else float("inf"), "ops/s", True)
+
+
+def _best_of(func: Callable[[], object], repeat: int) -> float:
+    """Minimum wall time over ``repeat`` runs; the least noisy estimator."""
+    timings = []
+    for _ in range(max(1, repeat)):
+        began = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - began)
+    return min(timings)
+
+
+def _unlimited_controller() -> CrawlerController:
+    # Giới hạn đủ lớn để benchmark đo chi phí xử lý chứ không phải thời gian chờ
+    return CrawlerController(rate_limit_per_minute=10**9)
+
+
+def bench_crawl(size: int) -> List[Measurement]:
+    keywords = generate_keywords(size)
+    db = Database()
+    crawler = KeywordCrawler(SearchConsoleClient(SITE_URL), db, _unlimited_controller())
+    start = time.perf_counter()
+    results = crawler.crawl_keywords(keywords)
+    elapsed = time.perf_counter() - start
+    db.close()
+    return [_rate("crawl.keywords_per_s", len(results), elapsed)]
+
+
+def bench_database(size: int, lookups: int = 1000, repeat: int = 3) -> List[Measurement]:
+    rows = list(iter_rankings(size))
+    db = Database()
+    start = time.perf_counter()
+    for row in rows:
+        db.upsert_keyword_ranking(row)
+    upsert_elapsed = time.perf_counter() - start
+
+    scan_elapsed = _best_of(db.fetch_keyword_rankings, repeat)
+
+    sample = [row.keyword for row in rows[:: max(1, len(rows) // lookups)]]
+
+    def lookup() -> None:
+        for keyword in sample:
+            db.fetch_keyword_rankings(keyword)
+
+    lookup_elapsed = _best_of(lookup, repeat)
+    db.close()
+    return [
+        _rate("db.upserts_per_s", len(rows), upsert_elapsed),
+        _rate("db.scan_rows_per_s", len(rows), scan_elapsed),
+        _rate("db.keyword_lookups_per_s", len(sample), lookup_elapsed),
+    ]
+
+
+def bench_segments(size: int, snapshots: int = 3, repeat: int = 3) -> List[Measurement]:
+    """Compare the SQLite and segment ranking stores on disk: ingest, size, scan."""
+    rows = list(iter_rankings(size, snapshots))
+    measurements: List[Measurement] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        stores: Dict[str, RankingStore] = {
+            "sqlite": Database(root / "sqlite" / "rankings.db"),
+            "segments": SegmentRankingStore(root / "segments"),
+        }
+        for label, store in stores.items():
+            start = time.perf_counter()
+            for row in rows:
+                store.upsert_keyword_ranking(row)
+            ingest_elapsed = time.perf_counter() - start
+            scan_elapsed = _best_of(store.fetch_keyword_rankings, repeat)
+            store.close()
+            on_disk = sum(path.stat().st_size for path in (root / label).rglob("*") if path.is_file())
+            measurements += [
+                _rate(f"store.{label}_ingest_per_s", len(rows), ingest_elapsed),
+                _rate(f"store.{label}_scan_rows_per_s", len(rows), scan_elapsed),
+                Measurement(f"store.{label}_bytes_per_row", on_disk / len(rows), "B", False),
+            ]
+    return measurements
+
+
+def _peak_memory(func: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+@dataclass
+class _DictRanking:
+    """Pre-slots record layout, kept only as the memory benchmark's reference."""
+
+    keyword: str
+    url: str
+    position: float
+    impressions: int
+    clicks: int
+    fetched_at: str
+
+
+def _bytes_per_record(build: Callable[[], List[object]], count: int) -> float:
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        records = build()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del records
+    return (after - before) / max(1, count)
+
+
+def bench_memory(size: int) -> List[Measurement]:
+    """Retained bytes per crawled keyword and peak memory of a crawl run.
+
+    ``record_bytes_dict`` reproduces the old layout (a ``__dict__``-backed
+    ranking plus an identical ``CrawlResult`` per keyword);
+    ``record_bytes_slotted`` is the current single slotted record.
+    """
+    client = SearchConsoleClient(SITE_URL)
+    keywords = generate_keywords(size)
+
+    def dict_records() -> List[object]:
+        pairs: List[object] = []
+        for keyword in keywords:
+            metrics = client.fetch_keyword_metrics(keyword)
+            pairs.append((_DictRanking(**metrics), _DictRanking(**metrics)))
+        return pairs
+
+    def slotted_records() -> List[object]:
+        return [KeywordRanking(**client.fetch_keyword_metrics(keyword)) for keyword in keywords]
+
+    measurements = [
+        Measurement("memory.record_bytes_dict", _bytes_per_record(dict_records, size), "B", False),
+        Measurement("memory.record_bytes_slotted", _bytes_per_record(slotted_records, size), "B", False),
+    ]
+
+    def crawl(stream: bool) -> None:
+        db = Database()
+        crawler = KeywordCrawler(client, db, _unlimited_controller())
+        if stream:
+            for _ in crawler.iter_crawl(keywords):
+                pass
+        else:
+            crawler.crawl_keywords(keywords)
+        db.close()
+
+    measurements.append(Measurement("memory.crawl_list_peak_mib", _peak_memory(lambda: crawl(False)), "MiB", False))
+    measurements.append(Measurement("memory.crawl_stream_peak_mib", _peak_memory(lambda: crawl(True)), "MiB", False))
+    return measurements
+
+
+def bench_exports(size: int, years: int, repeat: int = 3) -> List[Measurement]:
+    db = Database()
+    for row in iter_rankings(size):
+        db.upsert_keyword_ranking(row)
+    pipeline = ReportingPipeline(GA4Client(PROPERTY_ID), SearchConsoleClient(SITE_URL), db)
+    start, end = date_range(years)
+    pipeline.generate(start, end)
+
+    measurements: List[Measurement] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(tmp)
+        for label, newline_delimited in (("json", False), ("ndjson", True)):
+            target = out_dir / f"rankings.{label}"
+
+            def run() -> None:
+                export_keyword_rankings(db, target, newline_delimited=newline_delimited)
+
+            measurements.append(Measurement(f"export.rankings_{label}_s", _best_of(run, repeat), "s", False))
+            measurements.append(
+                Measurement(f"export.rankings_{label}_peak_mib", _peak_memory(run), "MiB", False)
+            )
+        elapsed = _best_of(lambda: export_reports(db, out_dir / "reports.json"), repeat)
+        measurements.append(Measurement("export.reports_s", elapsed, "s", False))
+    db.close()
+    return measurements
+
+
+def bench_reporting(years: int, repeat: int = 5) -> List[Measurement]:
+    db = Database()
+    pipeline = ReportingPipeline(GA4Client(PROPERTY_ID), SearchConsoleClient(SITE_URL), db)
+    start, end = date_range(years)
+    elapsed = _best_of(lambda: pipeline.generate(start, end, force=True), repeat)
+    cached_elapsed = _best_of(lambda: pipeline.generate(start, end), repeat)
+    db.close()
+    return [
+        Measurement(f"reporting.generate_{years}y_s", elapsed, "s", False),
+        Measurement(f"reporting.generate_{years}y_cached_s", cached_elapsed, "s", False),
+    ]
+
+
+BENCHMARKS = ("crawl", "database", "segments", "memory", "exports", "reporting")
+
+
+def run_suite(
+    size: int = 10_000,
+    years: int = 3,
+    only: Optional[Iterable[str]] = None,
+) -> Dict[str, object]:
+    selected = set(only or BENCHMARKS)
+    unknown = selected - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {sorted(unknown)}")
+    measurements: List[Measurement] = []
+    if "crawl" in selected:
+        measurements += bench_crawl(size)
+    if "database" in selected:
+        measurements += bench_database(size)
+    if "segments" in selected:
+        measurements += bench_segments(size)
+    if "memory" in selected:
+        measurements += bench_memory(size)
+    if "exports" in selected:
+        measurements += bench_exports(size, years)
+    if "reporting" in selected:
+        measurements += bench_reporting(years)
+    for item in measurements:
+        logger.info("%-36s %14.4f %s", item.name, item.value, item.unit)
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "workload": {"keywords": size, "years": years},
+        "metrics": {item.name: asdict(item) for item in measurements},
+    }
+
+
+def write_results(results: Dict[str, object], path: str | Path) -> Path:
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return out
+
+
+def load_results(path: str | Path) -> Dict[str, object]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def compare(
+    current: Dict[str, object],
+    baseline: Dict[str, object],
+    threshold: float = 0.2,
+    min_delta_s: float = 0.005,
+) -> List[Regression]:
+    """Return metrics that are worse than ``baseline`` by more than ``threshold``.
+
+    Metrics missing from either side are ignored so the suite can grow
+    without invalidating stored baselines. Timings that moved by less
+    than ``min_delta_s`` seconds are treated as scheduler noise.
+    """
+    regressions: List[Regression] = []
+    current_metrics: Dict[str, Dict[str, object]] = current["metrics"]  # type: ignore[assignment]
+    baseline_metrics: Dict[str, Dict[str, object]] = baseline["metrics"]  # type: ignore[assignment]
+    for name, base in baseline_metrics.items():
+        now = current_metrics.get(name)
+        if now is None:
+            continue
+        base_value = float(base["value"])  # type: ignore[arg-type]
+        now_value = float(now["value"])  # type: ignore[arg-type]
+        if base_value == 0:
+            continue
+        if base["unit"] == "s" and abs(now_value - base_value) < min_delta_s:
+            continue
+        change = (now_value - base_value) / base_value
+        worse = -change if base["higher_is_better"] else change
+        if worse > threshold:
+            regressions.append(Regression(name, base_value, now_value, change))
+    return regressions
+
+
+__all__ = [
+    "BENCHMARKS",
+    "Measurement",
+    "Regression",
+    "bench_crawl",
+    "bench_database",
+    "bench_exports",
+    "bench_memory",
+    "bench_reporting",
+    "bench_segments",
+    "compare",
+    "load_results",
+    "run_suite",
+    "write_results",
+]
@@ -0,0 +1,78 @@
+"""Deterministic synthetic workloads for the benchmark suite.
+
+Keywords are derived from SHA-256 digests of their index so every run,
+on every machine, crawls exactly the same keyword set; ranking metrics
+then come from the hash-based mocks in ``SearchConsoleClient`` and
+``GA4Client`` without any network access.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import date, timedelta
+from typing import Iterator, List, Tuple
+
+from integrations.search_console import SearchConsoleClient
+from storage.database import KeywordRanking
+
+
+SITE_URL = "https://bench.example.com"
+PROPERTY_ID = "GA4-BENCH"
+
+_MODIFIERS = ["how to", "best", "cheap", "buy", "what is", "free", "top", "online", "near me", "vs"]
+_TOPICS = [
+    "seo",
+    "keyword research",
+    "link building",
+    "content marketing",
+    "technical audit",
+    "pricing",
+    "analytics",
+    "site speed",
+    "backlinks",
+    "local search",
+    "schema markup",
+    "crawl budget",
+]
+
+
+def keyword_for(index: int) -> str:
+    digest = hashlib.sha256(f"bench-{index}".encode("utf-8")).digest()
+    modifier = _MODIFIERS[digest[0] % len(_MODIFIERS)]
+    topic = _TOPICS[digest[1] % len(_TOPICS)]
+    # Hậu tố theo chỉ số đảm bảo mỗi từ khóa là duy nhất
+    return f"{modifier} {topic} {index}"
+
+
+def iter_keywords(count: int) -> Iterator[str]:
+    for index in range(count):
+        yield keyword_for(index)
+
+
+def generate_keywords(count: int) -> List[str]:
+    return list(iter_keywords(count))
+
+
+def iter_rankings(count: int, snapshots: int = 1, start: date = date(2023, 1, 1)) -> Iterator[KeywordRanking]:
+    """Yield ``count`` keywords x ``snapshots`` daily ranking rows."""
+    client = SearchConsoleClient(SITE_URL)
+    for snapshot in range(snapshots):
+        fetched_at = f"{(start + timedelta(days=snapshot)).isoformat()}T00:00:00"
+        for keyword in iter_keywords(count):
+            metrics = client.fetch_keyword_metrics(keyword)
+            metrics["fetched_at"] = fetched_at
+            yield KeywordRanking(**metrics)
+
+
+def date_range(years: int, end: date = date(2024, 12, 31)) -> Tuple[date, date]:
+    return end - timedelta(days=365 * years - 1), end
+
+
+__all__ = [
+    "PROPERTY_ID",
+    "SITE_URL",
+    "date_range",
+    "generate_keywords",
+    "iter_keywords",
+    "iter_rankings",
+    "keyword_for",
+]
@@ -0,0 +1,6 @@
+"""Cho phép chạy ``python -m ckt <subcommand>``."""
+import sys
+
+from ckt.cli import main
+
+sys.exit(main())
@@ -0,0 +1,280 @@
+"""Command line entry point for short-lived and cron invocations.
+
+``python -m ckt <subcommand>`` where the subcommand is one of ``crawl``,
+``report``, ``export``, ``publish-due`` or ``serve-metrics``. Only
+``argparse`` is imported up front; each handler imports the subsystems it
+needs, so an export never loads the crawler and nothing loads
+``requests``, ``bs4`` or ``apscheduler`` unless it is used.
+
+Every work subcommand applies the ``metrics`` settings block; a run can
+also serve ``/metrics`` for its own lifetime (``--metrics-port``) or leave
+a snapshot for node_exporter's textfile collector (``--metrics-file``).
+``serve-metrics`` is a standalone exporter for the database state those
+runs leave behind.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+DEFAULT_DB_PATH = "data/ckt.db"
+
+
+def _load_settings(args: argparse.Namespace) -> Any:
+    settings = getattr(args, "_settings", None)
+    if settings is not None:
+        return settings
+    from config.settings import Settings
+
+    settings = Settings.load(args.config)
+    if settings.tracing:
+        from monitoring.tracing import configure_tracing
+
+        configure_tracing(settings.tracing)
+    args._settings = settings
+    return settings
+
+
+@contextmanager
+def _metrics_session(args: argparse.Namespace) -> Iterator[None]:
+    """Apply the ``metrics`` settings and CLI overrides around one work subcommand."""
+    from monitoring.metrics import REGISTRY, configure_metrics, write_metrics
+
+    config = dict(_load_settings(args).metrics or {})
+    if args.metrics_port is not None:
+        config.update(enabled=True, port=args.metrics_port)
+    server = None
+    try:
+        server = configure_metrics(config)
+    except OSError as exc:
+        # Cổng bận (ví dụ serve-metrics đang chạy) không được làm hỏng lần chạy cron
+        logging.getLogger(__name__).warning("Metrics endpoint not started: %s", exc)
+    if args.metrics_file:
+        REGISTRY.enable()
+    try:
+        yield
+    finally:
+        if args.metrics_file:
+            write_metrics(args.metrics_file)
+        if server is not None:
+            server.stop()
+
+
+def _open_database(args: argparse.Namespace) -> Any:
+    from storage.database import Database
+
+    return Database(args.db)
+
+
+def _iter_raw_keywords(args: argparse.Namespace) -> Iterator[Optional[str]]:
+    from crawler.ingest import read_keyword_file
+
+    yield from args.keywords
+    for path in args.keywords_file or ():
+        if path == "-":
+            yield from sys.stdin
+        else:
+            yield from read_keyword_file(path, column=args.column)
+
+
+# Các lệnh con -----------------------------------------------------------------
+def cmd_crawl(args: argparse.Namespace) -> int:
+    from crawler.bot import CrawlerController, KeywordCrawler
+    from crawler.ingest import KeywordIngestor
+    from integrations.search_console import SearchConsoleClient
+
+    if not args.keywords and not args.keywords_file:
+        print("No keywords given", file=sys.stderr)
+        return 2
+    settings = _load_settings(args)
+    rate_limit = args.rate_limit or settings.crawler.get("rate_limit_per_minute", 60)
+    database = _open_database(args)
+    ingestor = KeywordIngestor(args.dedupe, capacity=args.capacity, seen_path=args.seen_db)
+    try:
+        crawler = KeywordCrawler(
+            SearchConsoleClient(settings.search_console["site_url"]),
+            database,
+            CrawlerController(rate_limit_per_minute=rate_limit),
+        )
+        crawled = 0
+        for ranking in crawler.iter_crawl(ingestor.feed(_iter_raw_keywords(args))):
+            # Chỉ ghi nhớ từ khóa đã crawl thành công; từ khóa lỗi được thử lại lần sau
+            ingestor.mark_done(ranking.keyword)
+            crawled += 1
+    finally:
+        ingestor.close()
+        database.close()
+    stats = ingestor.stats
+    print(
+        f"Crawled {crawled}/{stats.unique} keywords "
+        f"(read {stats.input}, skipped {stats.duplicates} duplicates and {stats.invalid} invalid)"
+    )
+    return 0 if crawled == stats.unique else 1
+
+
+def cmd_report(args: argparse.Namespace) -> int:
+    from datetime import date, timedelta
+
+    from integrations.ga4 import GA4Client
+    from integrations.search_console import SearchConsoleClient
+    from reporting.pipeline import ReportingPipeline
+
+    settings = _load_settings(args)
+    end = date.fromisoformat(args.end) if args.end else date.today()
+    start = date.fromisoformat(args.start) if args.start else end - timedelta(days=args.days - 1)
+    database = _open_database(args)
+    try:
+        pipeline = ReportingPipeline(
+            GA4Client(settings.ga4["property_id"]),
+            SearchConsoleClient(settings.search_console["site_url"]),
+            database,
+            **settings.reporting,
+        )
+        report = pipeline.generate(start, end, force=args.force)
+    finally:
+        database.close()
+    print(
+        f"Report {report.start_date} -> {report.end_date}: {report.total_clicks} clicks, "
+        f"{report.total_impressions} impressions, avg position {report.average_position}"
+        f" ({'cached' if report.cached else 'generated'} at {report.generated_at})"
+    )
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    from reporting.export import export_keyword_rankings, export_reports
+
+    database = _open_database(args)
+    try:
+        if args.kind == "rankings":
+            out = args.out or "reporting/output/keyword_rankings.json"
+            path = export_keyword_rankings(database, out, keyword=args.keyword, newline_delimited=args.ndjson)
+        else:
+            out = args.out or "reporting/output/reports.json"
+            path = export_reports(database, out, newline_delimited=args.ndjson)
+    finally:
+        database.close()
+    print(f"Exported {args.kind} to {path}")
+    return 0
+
+
+def cmd_publish_due(args: argparse.Namespace) -> int:
+    from scheduler.content_scheduler import ContentScheduler
+
+    database = _open_database(args)
+    try:
+        posted = ContentScheduler(database).run_due()
+    finally:
+        database.close()
+    for post in posted:
+        print(f"Posted #{post.id} {post.title} by {post.author}")
+    print(f"Published {len(posted)} posts")
+    return 0
+
+
+def cmd_serve_metrics(args: argparse.Namespace) -> int:
+    import time
+
+    from monitoring.metrics import serve_metrics
+    from monitoring.status import register_database_gauges
+
+    database = _open_database(args)
+    register_database_gauges(database)
+    server = serve_metrics(args.host, args.port)
+    host, port = server.address
+    print(f"Serving metrics for {args.db} on http://{host}:{port}/metrics")
+    try:
+        if args.duration is not None:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        database.close()
+    return 0
+
+
+COMMANDS: Dict[str, Callable[[argparse.Namespace], int]] = {
+    "crawl": cmd_crawl,
+    "report": cmd_report,
+    "export": cmd_export,
+    "publish-due": cmd_publish_due,
+    "serve-metrics": cmd_serve_metrics,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m ckt", description="Crawl Keyword Tracking command line")
+    parser.add_argument("--config", help="settings JSON file (default: $CKT_CONFIG or config/settings.json)")
+    parser.add_argument(
+        "--db",
+        default=os.environ.get("CKT_DB", DEFAULT_DB_PATH),
+        help=f"SQLite database path (default: $CKT_DB or {DEFAULT_DB_PATH})",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="log at INFO level")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    work = argparse.ArgumentParser(add_help=False)
+    work.add_argument("--metrics-port", type=int, help="serve /metrics on this port while the command runs")
+    work.add_argument("--metrics-file", help="write a node_exporter textfile snapshot here on exit")
+
+    crawl = sub.add_parser("crawl", parents=[work], help="crawl keyword rankings")
+    crawl.add_argument("keywords", nargs="*")
+    crawl.add_argument(
+        "--keywords-file",
+        action="append",
+        help="keyword dump: text, .csv/.tsv, .ndjson, optionally .gz ('-' for stdin lines); repeatable",
+    )
+    crawl.add_argument("--column", default="keyword", help="CSV column / NDJSON field holding the keyword")
+    crawl.add_argument(
+        "--dedupe",
+        choices=["bloom", "disk"],
+        default="bloom",
+        help="bloom: fixed memory, rare false positives; disk: exact SQLite-backed set",
+    )
+    crawl.add_argument("--capacity", type=int, default=1_000_000, help="expected unique keywords (bloom)")
+    crawl.add_argument("--seen-db", help="persistent seen-set for --dedupe disk, skipping keywords across runs")
+    crawl.add_argument("--rate-limit", type=int, help="requests per minute (default from settings)")
+
+    report = sub.add_parser("report", parents=[work], help="generate a traffic report")
+    report.add_argument("--start", help="ISO start date (default: end - days + 1)")
+    report.add_argument("--end", help="ISO end date (default: today)")
+    report.add_argument("--days", type=int, default=7)
+    report.add_argument("--force", action="store_true", help="recompute even if a valid cached report exists")
+
+    export = sub.add_parser("export", parents=[work], help="export rankings or reports to JSON")
+    export.add_argument("kind", choices=["rankings", "reports"])
+    export.add_argument("--out")
+    export.add_argument("--keyword", help="only export this keyword (rankings)")
+    export.add_argument("--ndjson", action="store_true", help="write newline-delimited JSON")
+
+    sub.add_parser("publish-due", parents=[work], help="mark due scheduled content as posted")
+
+    serve = sub.add_parser("serve-metrics", help="export database state gauges on /metrics")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=9108)
+    serve.add_argument("--duration", type=float, help="stop after this many seconds")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    if args.command == "serve-metrics":
+        return cmd_serve_metrics(args)
+    with _metrics_session(args):
+        return COMMANDS[args.command](args)
+
+
+__all__ = ["COMMANDS", "build_parser", "main"]
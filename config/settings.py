@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import json
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict
 
@@ -18,6 +18,22 @@ DEFAULT_CONFIG = {
     "crawler": {
         "rate_limit_per_minute": 30,
     },
+    "reporting": {
+        "open_window_days": 3,
+        "stale_after_seconds": 3600,
+    },
+    "metrics": {
+        "enabled": False,
+        "host": "127.0.0.1",
+        "port": 9108,
+    },
+    "tracing": {
+        "enabled": False,
+        "ring_size": 10000,
+        "trace_file": None,
+        "profile_file": None,
+        "profile_interval": 0.005,
+    },
 }
 
 
@@ -26,6 +42,9 @@ class Settings:
     search_console: Dict[str, Any]
     ga4: Dict[str, Any]
     crawler: Dict[str, Any]
+    reporting: Dict[str, Any] = field(default_factory=dict)
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    tracing: Dict[str, Any] = field(default_factory=dict)
 
     @classmethod
     def load(cls, config_path: str | None = None) -> "Settings":
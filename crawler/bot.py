@@ -3,15 +3,30 @@ from __future__ import annotations
 
 import time
 from collections import deque
-from dataclasses import dataclass
 from threading import Condition
-from typing import Deque, Iterable, List, Optional
+from typing import Deque, Iterable, Iterator, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 from integrations.search_console import SearchConsoleClient
-from storage.database import Database, KeywordRanking
+from monitoring.metrics import REGISTRY
+from monitoring.tracing import span
+from storage.database import KeywordRanking
+from storage.rankings import RankingStore
+
+
+_SLOT_WAIT_SECONDS = REGISTRY.histogram(
+    "ckt_crawler_slot_wait_seconds",
+    "Time spent blocked in CrawlerController.wait_for_slot.",
+)
+_CRAWLED_KEYWORDS = REGISTRY.counter(
+    "ckt_crawler_keywords",
+    "Keywords processed by KeywordCrawler by outcome.",
+    ("outcome",),
+)
+_CRAWLED_OK = _CRAWLED_KEYWORDS.labels("ok")
+_CRAWLED_ERROR = _CRAWLED_KEYWORDS.labels("error")
 
 
 class CrawlerController:
@@ -38,6 +53,10 @@ class CrawlerController:
             self._condition.notify_all()
 
     def wait_for_slot(self) -> None:
+        with _SLOT_WAIT_SECONDS.time():
+            self._wait_for_slot()
+
+    def _wait_for_slot(self) -> None:
         with self._condition:
             while True:
                 while self._paused:
@@ -57,38 +76,54 @@ class CrawlerController:
                     self._timestamps.popleft()
 
 
-@dataclass
-class CrawlResult:
-    keyword: str
-    url: str
-    position: float
-    impressions: int
-    clicks: int
-    fetched_at: str
+# Kết quả crawl chính là bản ghi đã được lưu: không tạo thêm bản sao thứ hai
+CrawlResult = KeywordRanking
 
 
 class KeywordCrawler:
     def __init__(
         self,
         client: SearchConsoleClient,
-        database: Database,
+        database: RankingStore,
         controller: Optional[CrawlerController] = None,
     ) -> None:
         self.client = client
         self.database = database
         self.controller = controller or CrawlerController()
 
-    def crawl_keywords(self, keywords: Iterable[str]) -> List[CrawlResult]:
-        results: List[CrawlResult] = []
+    def iter_crawl(self, keywords: Iterable[str]) -> Iterator[KeywordRanking]:
+        """Crawl ``keywords`` lazily, yielding each ranking once it is persisted.
+
+        Nothing is accumulated, so memory stays flat however many keywords
+        are streamed through; failed keywords are logged and skipped.
+        """
+        last_fetched_at: object = None
         for keyword in keywords:
-            self.controller.wait_for_slot()
-            try:
-                metrics = self.client.fetch_keyword_metrics(keyword)
-                ranking = KeywordRanking(**metrics)
-                self.database.upsert_keyword_ranking(ranking)
-                results.append(CrawlResult(**metrics))
-            except Exception as exc:  # network or unexpected errors
-                logger.exception("Failed to fetch metrics for keyword '%s'", keyword)
+            with span("crawl.keyword", keyword=keyword):
+                self.controller.wait_for_slot()
+                try:
+                    with span("crawl.fetch"):
+                        metrics = self.client.fetch_keyword_metrics(keyword)
+                    # Các lần crawl trong cùng một giây dùng chung chuỗi fetched_at
+                    if metrics["fetched_at"] == last_fetched_at:
+                        metrics["fetched_at"] = last_fetched_at
+                    last_fetched_at = metrics["fetched_at"]
+                    ranking = KeywordRanking(**metrics)
+                    with span("crawl.upsert"):
+                        self.database.upsert_keyword_ranking(ranking)
+                except Exception:  # network or unexpected errors
+                    _CRAWLED_ERROR.inc()
+                    logger.exception("Failed to fetch metrics for keyword '%s'", keyword)
+                    continue
+                _CRAWLED_OK.inc()
+            yield ranking
+        # Đưa sketch vị trí của lô vào kho lưu trữ
+        self.database.flush_sketches()
+
+    def crawl_keywords(self, keywords: Iterable[str]) -> List[CrawlResult]:
+        with span("crawl.batch") as batch:
+            results = list(self.iter_crawl(keywords))
+            batch.set("keywords", len(results))
         return results
 
 
@@ -2,21 +2,23 @@
 
 This module is optional to the mock integrations and demonstrates
 real-world resilient fetching with retries to avoid crashes on
-transient network errors.
+transient network errors. ``requests`` and ``bs4`` are imported when the
+first ``WebFetcher`` is created so importing this module stays cheap.
 """
 from __future__ import annotations
 
 import logging
 import time
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
-import requests
-from bs4 import BeautifulSoup
+from monitoring.metrics import UPSTREAM_REQUEST_SECONDS
 
 
 logger = logging.getLogger(__name__)
 
+_GET_SECONDS = UPSTREAM_REQUEST_SECONDS.labels("web_fetcher", "get")
+
 
 @dataclass
 class FetchResult:
@@ -37,6 +39,9 @@ class WebFetcher:
         self.timeout = timeout
         self.max_retries = max(0, max_retries)
         self.backoff_factor = max(0.0, backoff_factor)
+        import requests
+
+        self._requests = requests
         self.session = requests.Session()
         self.session.headers.update(
             {
@@ -52,17 +57,18 @@ class WebFetcher:
         attempt = 0
         while True:
             try:
-                resp = self.session.get(url, timeout=self.timeout)
+                with _GET_SECONDS.time():
+                    resp = self.session.get(url, timeout=self.timeout)
                 text = resp.text
                 title = None
                 try:
-                    soup = BeautifulSoup(text, "html.parser")
+                    soup = _parse_html(text)
                     title_tag = soup.find("title")
                     title = title_tag.get_text(strip=True) if title_tag else None
                 except Exception:  # parsing errors shouldn't crash the bot
                     logger.exception("Failed to parse HTML for %s", url)
                 return FetchResult(url=url, status_code=resp.status_code, text=text, parsed_title=title)
-            except requests.RequestException as exc:
+            except self._requests.RequestException as exc:
                 attempt += 1
                 logger.warning("Network error on GET %s (attempt %s/%s): %s", url, attempt, self.max_retries, exc)
                 if attempt > self.max_retries:
@@ -73,5 +79,11 @@ class WebFetcher:
                 time.sleep(sleep_s)
 
 
+def _parse_html(text: str) -> Any:
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(text, "html.parser")
+
+
 __all__ = ["WebFetcher", "FetchResult"]
 
@@ -0,0 +1,329 @@
+"""Streaming bulk keyword ingestion with bounded-memory deduplication.
+
+Keyword dumps (plain text, CSV or NDJSON, optionally gzip-compressed) are
+read line by line through a large buffer, never loaded whole. Each keyword
+is normalized (NFKC, case-folded, whitespace collapsed) and checked
+against a seen-set before it is handed to the crawler, so crawl budget is
+never spent twice on the same normalized keyword::
+
+    with KeywordIngestor(capacity=50_000_000) as ingestor:
+        for ranking in crawler.iter_crawl(ingestor.ingest_files(["dump.csv.gz"])):
+            ...
+        print(ingestor.stats)
+
+Two seen-sets are available. ``BloomFilter`` uses fixed memory sized from
+the expected capacity; it never lets a duplicate through but drops a
+small, configurable fraction of unique keywords as false positives.
+``DiskSet`` is exact and keeps its keys in a scratch SQLite file. Give it
+a path to deduplicate across runs; only keywords confirmed with
+``KeywordIngestor.mark_done`` (i.e. crawled successfully) are kept for the
+next run, so failed keywords are retried.
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Protocol, Sequence
+
+from monitoring.metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+_INGESTED = REGISTRY.counter(
+    "ckt_ingest_keywords",
+    "Keywords read by KeywordIngestor by outcome (unique, duplicate or invalid).",
+    ("outcome",),
+)
+_INGESTED_UNIQUE = _INGESTED.labels("unique")
+_INGESTED_DUPLICATE = _INGESTED.labels("duplicate")
+_INGESTED_INVALID = _INGESTED.labels("invalid")
+
+READ_BUFFER_BYTES = 1 << 20
+
+
+def normalize_keyword(raw: str) -> str:
+    """NFKC-normalize, case-fold and collapse whitespace; ``""`` means invalid."""
+    return " ".join(unicodedata.normalize("NFKC", raw).casefold().split())
+
+
+# Tập đã gặp ------------------------------------------------------------------------
+class SeenSet(Protocol):
+    def add(self, key: str) -> bool:
+        """Record ``key``; return ``True`` if it was not seen before."""
+
+    def mark_done(self, key: str) -> None:
+        """Confirm ``key`` was processed, so a persistent set keeps it for later runs."""
+
+    def close(self) -> None:
+        ...
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for ``capacity`` keys at ``error_rate``."""
+
+    def __init__(self, capacity: int, error_rate: float = 1e-4) -> None:
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate in (0, 1)")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.size_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        # Băm kép (Kirsch–Mitzenmacher): k vị trí từ hai giá trị băm
+        second = int.from_bytes(digest[8:], "little") | 1
+        for index in range(self.hash_count):
+            yield (first + index * second) % self.size_bits
+
+    def add(self, key: str) -> bool:
+        bits = self._bits
+        new = False
+        for position in self._positions(key):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+            if self.count == self.capacity + 1:
+                logger.warning("Bloom filter exceeded its capacity of %s keys; false positives will rise", self.capacity)
+        return new
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+    def mark_done(self, key: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class DiskSet:
+    """Exact seen-set in a SQLite file; memory is bounded by SQLite's page cache.
+
+    Keys added but never passed to ``mark_done`` are dropped when the file
+    is reopened, so a persistent set only remembers work that finished.
+    """
+
+    def __init__(self, path: Path | str | None = None, commit_every: int = 10_000) -> None:
+        self._temporary = path is None
+        if path is None:
+            handle, name = tempfile.mkstemp(prefix="ckt-seen-", suffix=".db")
+            os.close(handle)
+            path = name
+        self.path = Path(path)
+        self.commit_every = max(1, commit_every)
+        self._conn = sqlite3.connect(self.path)
+        if self._temporary:
+            # File tạm không cần bền vững: bỏ journal để ghi nhanh hơn
+            self._conn.execute("PRAGMA journal_mode=OFF")
+            self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS seen (
+                keyword TEXT PRIMARY KEY,
+                done INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(seen)")}
+        if "done" not in columns:
+            # Tệp cũ: mọi khóa đã lưu được coi là đã xử lý xong
+            self._conn.execute("ALTER TABLE seen ADD COLUMN done INTEGER NOT NULL DEFAULT 1")
+        # Khóa của lần chạy trước chưa được xác nhận (crawl lỗi hoặc tiến trình chết): thử lại
+        self._conn.execute("DELETE FROM seen WHERE done = 0")
+        self._conn.commit()
+        self._pending = 0
+
+    def _written(self) -> None:
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self._conn.commit()
+            self._pending = 0
+
+    def add(self, key: str) -> bool:
+        cur = self._conn.execute("INSERT OR IGNORE INTO seen (keyword) VALUES (?)", (key,))
+        self._written()
+        return cur.rowcount == 1
+
+    def mark_done(self, key: str) -> None:
+        self._conn.execute("UPDATE seen SET done = 1 WHERE keyword = ?", (key,))
+        self._written()
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+        if self._temporary:
+            self.path.unlink(missing_ok=True)
+
+
+# Đọc tệp ---------------------------------------------------------------------------
+def _open_text(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8-sig", errors="replace", newline="")
+    return open(path, encoding="utf-8-sig", errors="replace", newline="", buffering=READ_BUFFER_BYTES)
+
+
+def detect_format(path: Path | str) -> str:
+    """``csv``, ``tsv``, ``ndjson`` or ``text`` from the suffix, ignoring ``.gz``."""
+    name = Path(path).name.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    suffix = Path(name).suffix
+    if suffix in {".csv", ".tsv"}:
+        return suffix[1:]
+    if suffix in {".ndjson", ".jsonl", ".json"}:
+        return "ndjson"
+    return "text"
+
+
+def _read_delimited(stream: IO[str], column: str, delimiter: str, source: str) -> Iterator[Optional[str]]:
+    reader = csv.reader(stream, delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        return
+    try:
+        index = [name.strip().lower() for name in header].index(column.lower())
+    except ValueError:
+        raise ValueError(f"{source}: no {column!r} column in header {header}") from None
+    for row in reader:
+        yield row[index] if index < len(row) else None
+
+
+def _read_ndjson(stream: IO[str], column: str, source: str) -> Iterator[Optional[str]]:
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            logger.debug("%s:%s: skipping malformed JSON line", source, number)
+            yield None
+            continue
+        value = record.get(column) if isinstance(record, dict) else record
+        yield value if isinstance(value, str) else None
+
+
+def read_keyword_file(path: Path | str, column: str = "keyword", fmt: Optional[str] = None) -> Iterator[Optional[str]]:
+    """Stream raw keyword values from one file; ``None`` marks an unreadable record.
+
+    CSV/TSV files need a header row containing ``column``; NDJSON lines
+    are objects with a ``column`` field or bare JSON strings; any other
+    file is read as one keyword per line.
+    """
+    path = Path(path)
+    fmt = fmt or detect_format(path)
+    with _open_text(path) as stream:
+        if fmt in {"csv", "tsv"}:
+            yield from _read_delimited(stream, column, "," if fmt == "csv" else "\t", str(path))
+        elif fmt == "ndjson":
+            yield from _read_ndjson(stream, column, str(path))
+        else:
+            for line in stream:
+                yield line
+
+
+# Bộ nạp ----------------------------------------------------------------------------
+@dataclass
+class IngestStats:
+    input: int = 0
+    unique: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.duplicates + self.invalid
+
+
+class KeywordIngestor:
+    """Normalize and deduplicate keyword streams before they reach the crawler."""
+
+    def __init__(
+        self,
+        dedupe: str = "bloom",
+        capacity: int = 10_000_000,
+        error_rate: float = 1e-4,
+        seen_path: Path | str | None = None,
+    ) -> None:
+        if dedupe == "bloom":
+            self.seen: SeenSet = BloomFilter(capacity, error_rate)
+        elif dedupe == "disk":
+            self.seen = DiskSet(seen_path)
+        else:
+            raise ValueError(f"Unknown dedupe mode {dedupe!r}; expected 'bloom' or 'disk'")
+        self.stats = IngestStats()
+
+    def feed(self, raw_keywords: Iterable[Optional[str]]) -> Iterator[str]:
+        """Lazily yield each normalized keyword the first time it is seen."""
+        stats = self.stats
+        for raw in raw_keywords:
+            stats.input += 1
+            keyword = normalize_keyword(raw) if raw else ""
+            if not keyword:
+                stats.invalid += 1
+                _INGESTED_INVALID.inc()
+                continue
+            if not self.seen.add(keyword):
+                stats.duplicates += 1
+                _INGESTED_DUPLICATE.inc()
+                continue
+            stats.unique += 1
+            _INGESTED_UNIQUE.inc()
+            yield keyword
+
+    def ingest_files(
+        self,
+        paths: Sequence[Path | str],
+        column: str = "keyword",
+        fmt: Optional[str] = None,
+    ) -> Iterator[str]:
+        for path in paths:
+            logger.info("Ingesting keywords from %s", path)
+            yield from self.feed(read_keyword_file(path, column, fmt))
+
+    def mark_done(self, keyword: str) -> None:
+        """Confirm ``keyword`` was crawled; with ``seen_path`` it is then skipped on later runs."""
+        self.seen.mark_done(keyword)
+
+    def close(self) -> None:
+        self.seen.close()
+
+    def __enter__(self) -> "KeywordIngestor":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+__all__ = [
+    "BloomFilter",
+    "DiskSet",
+    "IngestStats",
+    "KeywordIngestor",
+    "SeenSet",
+    "detect_format",
+    "normalize_keyword",
+    "read_keyword_file",
+]
@@ -19,9 +19,10 @@ from reporting.pipeline import ReportingPipeline
 from reporting.export import export_keyword_rankings, export_reports
 from scheduler.content_scheduler import ContentScheduler
 from scheduler.job_scheduler import JobScheduler
-from storage.database import Database
+from storage.database import Database, record_to_dict
 from integrations.search_console import SearchConsoleClient
 from integrations.ga4 import GA4Client
+from monitoring.tracing import configure_tracing
 
 
 def run_demo() -> None:
@@ -31,6 +32,7 @@ def run_demo() -> None:
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
     settings = Settings.load()
+    configure_tracing(settings.tracing)
     database = Database()
 
     # --- Phần demo Crawler -------------------------------------------------------
@@ -94,7 +96,7 @@ def run_demo() -> None:
         "Impressions: {total_impressions}\n"
         "Avg. position: {average_position}\n"
         "Users (new/returning): {new_users}/{returning_users}"
-        .format(**report.__dict__)
+        .format(**record_to_dict(report))
     )
     export_reports(database, "reporting/output/reports.json")
 
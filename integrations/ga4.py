@@ -5,27 +5,38 @@ import hashlib
 from datetime import date, timedelta
 from typing import Dict, List
 
+from monitoring.metrics import UPSTREAM_REQUEST_SECONDS
+
+
+_TRAFFIC_METRICS_SECONDS = UPSTREAM_REQUEST_SECONDS.labels("ga4", "fetch_traffic_metrics")
+
+
+def generate_traffic_metrics(property_id: str, start: date, end: date) -> List[Dict[str, int]]:
+    """Deterministic new and returning users per day for ``property_id``."""
+    days = (end - start).days + 1
+    metrics: List[Dict[str, int]] = []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        digest = int(hashlib.sha256(f"{property_id}-{day.isoformat()}".encode("utf-8")).hexdigest(), 16)
+        new_users = digest % 300 + 50
+        returning_users = digest % 200
+        metrics.append(
+            {
+                "date": day.isoformat(),
+                "new_users": new_users,
+                "returning_users": returning_users,
+            }
+        )
+    return metrics
+
 
 class GA4Client:
     def __init__(self, property_id: str) -> None:
         self.property_id = property_id
 
     def fetch_traffic_metrics(self, start: date, end: date) -> List[Dict[str, int]]:
-        days = (end - start).days + 1
-        metrics: List[Dict[str, int]] = []
-        for i in range(days):
-            day = start + timedelta(days=i)
-            digest = int(hashlib.sha256(f"{self.property_id}-{day.isoformat()}".encode("utf-8")).hexdigest(), 16)
-            new_users = digest % 300 + 50
-            returning_users = digest % 200
-            metrics.append(
-                {
-                    "date": day.isoformat(),
-                    "new_users": new_users,
-                    "returning_users": returning_users,
-                }
-            )
-        return metrics
-
-
-__all__ = ["GA4Client"]
+        with _TRAFFIC_METRICS_SECONDS.time():
+            return generate_traffic_metrics(self.property_id, start, end)
+
+
+__all__ = ["GA4Client", "generate_traffic_metrics"]
@@ -0,0 +1,203 @@
+"""HTTP-backed Search Console and GA4 clients.
+
+Drop-in replacements for ``SearchConsoleClient`` and ``GA4Client`` that
+talk to a REST endpoint (the real APIs' shape, or the local stand-in in
+``integrations.stand_in``). Requests are retried with exponential backoff
+on network errors, 429 and 5xx responses, honouring ``Retry-After``, and
+date-range queries are paginated.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from integrations.stand_in import run_report_path, search_analytics_path
+from monitoring.metrics import REGISTRY, UPSTREAM_REQUEST_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+_RETRIES = REGISTRY.counter(
+    "ckt_upstream_retries",
+    "Upstream requests retried after a network error, 429 or 5xx response.",
+    ("client", "reason"),
+)
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamError(RuntimeError):
+    """Raised when an upstream request fails permanently or exhausts retries."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _JsonApi:
+    def __init__(
+        self,
+        client_name: str,
+        base_url: str,
+        session: Optional[requests.Session] = None,
+        timeout: float = 10.0,
+        max_retries: int = 5,
+        backoff_factor: float = 0.2,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.client_name = client_name
+        self.base_url = base_url.rstrip("/")
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_factor = max(0.0, backoff_factor)
+        self.max_backoff = max_backoff
+        self._retry_network = _RETRIES.labels(client_name, "network")
+        self._retry_status = {status: _RETRIES.labels(client_name, str(status)) for status in RETRYABLE_STATUS}
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        # Full jitter tránh các worker đồng loạt thử lại cùng lúc
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+    def post(self, path: str, body: Dict[str, Any], method: str) -> Dict[str, Any]:
+        url = f"{self.base_url}{path}"
+        timer = UPSTREAM_REQUEST_SECONDS.labels(self.client_name, method)
+        attempt = 0
+        while True:
+            try:
+                with timer.time():
+                    resp = self.session.post(url, json=body, timeout=self.timeout)
+            except requests.RequestException as exc:
+                if attempt >= self.max_retries:
+                    raise UpstreamError(f"{method} failed after {attempt + 1} attempts: {exc}") from exc
+                self._retry_network.inc()
+                logger.warning("Network error on %s (attempt %s/%s): %s", method, attempt + 1, self.max_retries, exc)
+                time.sleep(self._backoff(attempt, None))
+                attempt += 1
+                continue
+            if resp.status_code == 200:
+                return resp.json()
+            if resp.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                raise UpstreamError(
+                    f"{method} returned HTTP {resp.status_code} after {attempt + 1} attempts: {resp.text[:200]}",
+                    resp.status_code,
+                )
+            self._retry_status[resp.status_code].inc()
+            delay = self._backoff(attempt, resp.headers.get("Retry-After"))
+            logger.debug("HTTP %s on %s, retrying in %.2fs", resp.status_code, method, delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+class HttpSearchConsoleClient:
+    """Search Console client speaking the ``searchAnalytics/query`` REST API."""
+
+    def __init__(self, site_url: str, base_url: str, page_size: int = 25_000, **http_options: Any) -> None:
+        self.site_url = site_url
+        self.page_size = max(1, page_size)
+        self._api = _JsonApi("search_console_http", base_url, **http_options)
+        self._path = search_analytics_path(site_url)
+
+    def fetch_keyword_metrics(self, keyword: str) -> Dict[str, float | str]:
+        body = {
+            "dimensions": ["query", "page"],
+            "dimensionFilterGroups": [
+                {"filters": [{"dimension": "query", "operator": "equals", "expression": keyword}]}
+            ],
+            "rowLimit": 1,
+        }
+        rows = self._api.post(self._path, body, "fetch_keyword_metrics").get("rows") or []
+        payload: Dict[str, float | str] = {
+            "keyword": keyword,
+            "url": f"{self.site_url}/search/{keyword.replace(' ', '-')}",
+            "position": 10.0,
+            "impressions": 0,
+            "clicks": 0,
+        }
+        if rows:
+            row = rows[0]
+            keys = row.get("keys") or []
+            if len(keys) > 1:
+                payload["url"] = keys[1]
+            payload["position"] = float(row["position"])
+            payload["impressions"] = int(row["impressions"])
+            payload["clicks"] = int(row["clicks"])
+        payload["fetched_at"] = datetime.utcnow().isoformat(timespec="seconds")
+        return payload
+
+    def fetch_query_metrics(self, start: date, end: date) -> List[Dict[str, int | float | str]]:
+        results: List[Dict[str, int | float | str]] = []
+        start_row = 0
+        while True:
+            body = {
+                "startDate": start.isoformat(),
+                "endDate": end.isoformat(),
+                "dimensions": ["date"],
+                "rowLimit": self.page_size,
+                "startRow": start_row,
+            }
+            rows = self._api.post(self._path, body, "fetch_query_metrics").get("rows") or []
+            for row in rows:
+                results.append(
+                    {
+                        "date": row["keys"][0],
+                        "clicks": int(row["clicks"]),
+                        "impressions": int(row["impressions"]),
+                        "average_position": float(row["position"]),
+                    }
+                )
+            # Search Console không trả token trang, và máy chủ có thể giới hạn rowLimit
+            # thấp hơn page_size: chỉ trang rỗng mới có nghĩa là đã hết
+            if not rows:
+                return results
+            start_row += len(rows)
+
+
+class HttpGA4Client:
+    """GA4 client speaking the Data API ``runReport`` method."""
+
+    def __init__(self, property_id: str, base_url: str, page_size: int = 10_000, **http_options: Any) -> None:
+        self.property_id = property_id
+        self.page_size = max(1, page_size)
+        self._api = _JsonApi("ga4_http", base_url, **http_options)
+        self._path = run_report_path(property_id)
+
+    def fetch_traffic_metrics(self, start: date, end: date) -> List[Dict[str, int]]:
+        metrics: List[Dict[str, int]] = []
+        offset = 0
+        while True:
+            body = {
+                "dateRanges": [{"startDate": start.isoformat(), "endDate": end.isoformat()}],
+                "dimensions": [{"name": "date"}],
+                "metrics": [{"name": "newUsers"}, {"name": "returningUsers"}],
+                "limit": self.page_size,
+                "offset": offset,
+            }
+            response = self._api.post(self._path, body, "fetch_traffic_metrics")
+            rows = response.get("rows") or []
+            for row in rows:
+                raw = row["dimensionValues"][0]["value"]
+                values = row["metricValues"]
+                metrics.append(
+                    {
+                        "date": f"{raw[:4]}-{raw[4:6]}-{raw[6:8]}",
+                        "new_users": int(values[0]["value"]),
+                        "returning_users": int(values[1]["value"]),
+                    }
+                )
+            offset += len(rows)
+            if not rows or offset >= int(response.get("rowCount", offset)):
+                return metrics
+
+
+__all__ = ["HttpGA4Client", "HttpSearchConsoleClient", "RETRYABLE_STATUS", "UpstreamError"]
@@ -6,6 +6,62 @@ import math
 from datetime import date, datetime, timedelta
 from typing import Dict, List
 
+from monitoring.metrics import UPSTREAM_REQUEST_SECONDS
+
+
+_KEYWORD_METRICS_SECONDS = UPSTREAM_REQUEST_SECONDS.labels("search_console", "fetch_keyword_metrics")
+_QUERY_METRICS_SECONDS = UPSTREAM_REQUEST_SECONDS.labels("search_console", "fetch_query_metrics")
+
+
+def generate_keyword_metrics(
+    site_url: str,
+    keyword: str,
+    keyword_dataset: Dict[str, Dict[str, float]] | None = None,
+) -> Dict[str, float | str]:
+    """Deterministic ranking metrics for ``keyword``, or its entry in ``keyword_dataset``."""
+    payload = (keyword_dataset or {}).get(keyword)
+    if payload is None:
+        digest = int(hashlib.sha256(keyword.encode("utf-8")).hexdigest(), 16)
+        position = round(1 + (digest % 100) / 10, 2)
+        impressions = 100 + digest % 500
+        clicks = int(impressions * (1 / (1 + math.exp((position - 5) / 2))))
+        payload = {
+            "keyword": keyword,
+            "url": f"{site_url}/search/{keyword.replace(' ', '-')}",
+            "position": position,
+            "impressions": impressions,
+            "clicks": clicks,
+        }
+    payload = dict(payload)
+    payload.setdefault("keyword", keyword)
+    payload.setdefault("url", f"{site_url}/search/{keyword.replace(' ', '-')}")
+    payload.setdefault("position", 10.0)
+    payload.setdefault("impressions", 0)
+    payload.setdefault("clicks", 0)
+    payload["fetched_at"] = datetime.utcnow().isoformat(timespec="seconds")
+    return payload
+
+
+def generate_query_metrics(site_url: str, start: date, end: date) -> List[Dict[str, int | float | str]]:
+    """Deterministic daily Search Console aggregates for ``site_url`` between ``start`` and ``end``."""
+    days = (end - start).days + 1
+    results: List[Dict[str, int | float | str]] = []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        base = int(hashlib.sha256(f"{site_url}-{day.isoformat()}".encode("utf-8")).hexdigest(), 16)
+        clicks = base % 500 + 100
+        impressions = clicks * 5
+        avg_position = round(1 + (base % 90) / 10, 2)
+        results.append(
+            {
+                "date": day.isoformat(),
+                "clicks": clicks,
+                "impressions": impressions,
+                "average_position": avg_position,
+            }
+        )
+    return results
+
 
 class SearchConsoleClient:
     """Lớp tiện ích mô phỏng phản hồi của Search Console."""
@@ -15,46 +71,12 @@ class SearchConsoleClient:
         self.keyword_dataset = keyword_dataset or {}
 
     def fetch_keyword_metrics(self, keyword: str) -> Dict[str, float | str]:
-        payload = self.keyword_dataset.get(keyword)
-        if payload is None:
-            digest = int(hashlib.sha256(keyword.encode("utf-8")).hexdigest(), 16)
-            position = round(1 + (digest % 100) / 10, 2)
-            impressions = 100 + digest % 500
-            clicks = int(impressions * (1 / (1 + math.exp((position - 5) / 2))))
-            payload = {
-                "keyword": keyword,
-                "url": f"{self.site_url}/search/{keyword.replace(' ', '-')}",
-                "position": position,
-                "impressions": impressions,
-                "clicks": clicks,
-            }
-        payload = dict(payload)
-        payload.setdefault("keyword", keyword)
-        payload.setdefault("url", f"{self.site_url}/search/{keyword.replace(' ', '-')}")
-        payload.setdefault("position", 10.0)
-        payload.setdefault("impressions", 0)
-        payload.setdefault("clicks", 0)
-        payload["fetched_at"] = datetime.utcnow().isoformat(timespec="seconds")
-        return payload
+        with _KEYWORD_METRICS_SECONDS.time():
+            return generate_keyword_metrics(self.site_url, keyword, self.keyword_dataset)
 
     def fetch_query_metrics(self, start: date, end: date) -> List[Dict[str, int | float | str]]:
-        days = (end - start).days + 1
-        results: List[Dict[str, int | float | str]] = []
-        for i in range(days):
-            day = start + timedelta(days=i)
-            base = int(hashlib.sha256(f"{self.site_url}-{day.isoformat()}".encode("utf-8")).hexdigest(), 16)
-            clicks = base % 500 + 100
-            impressions = clicks * 5
-            avg_position = round(1 + (base % 90) / 10, 2)
-            results.append(
-                {
-                    "date": day.isoformat(),
-                    "clicks": clicks,
-                    "impressions": impressions,
-                    "average_position": avg_position,
-                }
-            )
-        return results
-
-
-__all__ = ["SearchConsoleClient"]
+        with _QUERY_METRICS_SECONDS.time():
+            return generate_query_metrics(self.site_url, start, end)
+
+
+__all__ = ["SearchConsoleClient", "generate_keyword_metrics", "generate_query_metrics"]
@@ -0,0 +1,346 @@
+"""Local HTTP stand-in for the Search Console and GA4 APIs.
+
+The server answers the two endpoints used by ``integrations.http_clients``
+with the same deterministic data as ``SearchConsoleClient`` and
+``GA4Client``, and can inject latency, 429/5xx failures and a per-minute
+quota so that retry, rate-limit and concurrency behaviour can be
+load-tested offline::
+
+    python -m integrations.stand_in --port 8099 --latency lognormal:40:0.5 --error-5xx 0.01
+
+Endpoints (request and response bodies mirror the real APIs' shape):
+
+- ``POST /webmasters/v3/sites/{site}/searchAnalytics/query``
+- ``POST /v1beta/properties/{property}:runReport``
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import time
+from collections import Counter as _Counter, deque
+from dataclasses import dataclass, field
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from integrations.ga4 import generate_traffic_metrics
+from integrations.search_console import generate_keyword_metrics, generate_query_metrics
+
+
+logger = logging.getLogger(__name__)
+
+_SEARCH_ANALYTICS_PATH = re.compile(r"^/webmasters/v3/sites/(?P<site>[^/]+)/searchAnalytics/query$")
+_RUN_REPORT_PATH = re.compile(r"^/v1beta/properties/(?P<property>[^/:]+):runReport$")
+
+
+@dataclass
+class LatencyModel:
+    """Response delay distribution, in milliseconds.
+
+    ``kind`` is one of ``fixed`` (``a``), ``uniform`` (``a``..``b``),
+    ``exponential`` (mean ``a``) or ``lognormal`` (median ``a``, sigma ``b``).
+    """
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Parse ``kind:a[:b]``, e.g. ``lognormal:40:0.5`` or ``fixed:10``."""
+        parts = spec.split(":")
+        kind = parts[0]
+        values = [float(part) for part in parts[1:]] + [0.0, 0.0]
+        model = cls(kind, values[0], values[1])
+        model.sample(random.Random(0))  # validate kind
+        return model
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "exponential":
+            return rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        raise ValueError(f"Unknown latency distribution {self.kind!r}")
+
+
+@dataclass
+class StandInConfig:
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    error_rate_429: float = 0.0
+    error_rate_5xx: float = 0.0
+    quota_per_minute: Optional[int] = None
+    max_page_size: int = 25_000
+    seed: int = 0
+
+
+class _Quota:
+    """Sliding one-minute request window, same shape as ``CrawlerController``."""
+
+    def __init__(self, limit: Optional[int]) -> None:
+        self.limit = limit
+        self._timestamps: Deque[float] = deque()
+        self._lock = Lock()
+
+    def acquire(self) -> Optional[float]:
+        """Return ``None`` when admitted, otherwise seconds until a slot frees."""
+        if self.limit is None:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            while self._timestamps and now - self._timestamps[0] >= 60:
+                self._timestamps.popleft()
+            if len(self._timestamps) < self.limit:
+                self._timestamps.append(now)
+                return None
+            return 60 - (now - self._timestamps[0])
+
+
+class StandInServer:
+    """Threaded HTTP server emulating the Search Console and GA4 endpoints."""
+
+    def __init__(self, config: Optional[StandInConfig] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or StandInConfig()
+        self.stats: _Counter[str] = _Counter()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = Lock()
+        self._quota = _Quota(self.config.quota_per_minute)
+        self._stats_lock = Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[Thread] = None
+
+    # Vòng đời ---------------------------------------------------------------
+    @property
+    def address(self) -> Tuple[str, int]:
+        host, port = self._httpd.server_address[:2]
+        return str(host), int(port)
+
+    @property
+    def base_url(self) -> str:
+        return "http://%s:%s" % self.address
+
+    def start(self) -> "StandInServer":
+        if self._thread is None:
+            self._thread = Thread(target=self._httpd.serve_forever, name="ckt-stand-in", daemon=True)
+            self._thread.start()
+            logger.info("Stand-in API listening on %s", self.base_url)
+        return self
+
+    def serve_forever(self) -> None:
+        logger.info("Stand-in API listening on %s", self.base_url)
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # Xử lý yêu cầu -------------------------------------------------------------
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _draw(self) -> Tuple[float, float]:
+        with self._rng_lock:
+            return self.config.latency.sample(self._rng) / 1000.0, self._rng.random()
+
+    def _fault(self) -> Optional[Tuple[int, Dict[str, str], Dict[str, Any]]]:
+        delay, roll = self._draw()
+        if delay > 0:
+            time.sleep(delay)
+        retry_after = self._quota.acquire()
+        if retry_after is not None:
+            return 429, {"Retry-After": str(max(1, int(retry_after + 0.999)))}, _error(429, "RESOURCE_EXHAUSTED", "Quota exceeded")
+        if roll < self.config.error_rate_429:
+            return 429, {"Retry-After": "1"}, _error(429, "RESOURCE_EXHAUSTED", "Injected rate limit")
+        if roll < self.config.error_rate_429 + self.config.error_rate_5xx:
+            # Chia đều lỗi 5xx giữa 500 và 503
+            code = 503 if (roll - self.config.error_rate_429) < self.config.error_rate_5xx / 2 else 500
+            return code, {}, _error(code, "UNAVAILABLE" if code == 503 else "INTERNAL", "Injected failure")
+        return None
+
+    def search_analytics(self, site_url: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        dimensions = body.get("dimensions") or []
+        start_row = int(body.get("startRow", 0))
+        row_limit = min(int(body.get("rowLimit", 1000)), self.config.max_page_size)
+        if "query" in dimensions:
+            keywords = [
+                flt["expression"]
+                for group in body.get("dimensionFilterGroups", [])
+                for flt in group.get("filters", [])
+                if flt.get("dimension") == "query" and flt.get("operator", "equals") == "equals"
+            ]
+            rows = []
+            for keyword in keywords:
+                metrics = generate_keyword_metrics(site_url, keyword)
+                keys = [metrics["keyword"], metrics["url"]] if "page" in dimensions else [metrics["keyword"]]
+                rows.append(
+                    {
+                        "keys": keys,
+                        "clicks": metrics["clicks"],
+                        "impressions": metrics["impressions"],
+                        "ctr": metrics["clicks"] / metrics["impressions"] if metrics["impressions"] else 0.0,
+                        "position": metrics["position"],
+                    }
+                )
+        else:
+            start = date.fromisoformat(body["startDate"])
+            end = date.fromisoformat(body["endDate"])
+            rows = [
+                {
+                    "keys": [day["date"]],
+                    "clicks": day["clicks"],
+                    "impressions": day["impressions"],
+                    "ctr": day["clicks"] / day["impressions"],
+                    "position": day["average_position"],
+                }
+                for day in generate_query_metrics(site_url, start, end)
+            ]
+        page = rows[start_row : start_row + row_limit]
+        return {"rows": page, "responseAggregationType": "byProperty"}
+
+    def run_report(self, property_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        date_range = (body.get("dateRanges") or [{}])[0]
+        start = date.fromisoformat(date_range["startDate"])
+        end = date.fromisoformat(date_range["endDate"])
+        offset = int(body.get("offset", 0))
+        limit = min(int(body.get("limit", 10_000)), self.config.max_page_size)
+        days = generate_traffic_metrics(property_id, start, end)
+        rows = [
+            {
+                "dimensionValues": [{"value": day["date"].replace("-", "")}],
+                "metricValues": [{"value": str(day["new_users"])}, {"value": str(day["returning_users"])}],
+            }
+            for day in days[offset : offset + limit]
+        ]
+        return {
+            "dimensionHeaders": [{"name": "date"}],
+            "metricHeaders": [{"name": "newUsers"}, {"name": "returningUsers"}],
+            "rows": rows,
+            "rowCount": len(days),
+        }
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:  # noqa: N802 - http.server API
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b"{}"
+                path = self.path.split("?", 1)[0]
+                server._count("requests")
+                fault = server._fault()
+                if fault is not None:
+                    status, headers, payload = fault
+                    server._count(f"status_{status}")
+                    self._reply(status, payload, headers)
+                    return
+                try:
+                    body = json.loads(raw or b"{}")
+                    match = _SEARCH_ANALYTICS_PATH.match(path)
+                    if match:
+                        payload = server.search_analytics(unquote(match.group("site")), body)
+                    else:
+                        match = _RUN_REPORT_PATH.match(path)
+                        if not match:
+                            server._count("status_404")
+                            self._reply(404, _error(404, "NOT_FOUND", f"Unknown endpoint {path}"))
+                            return
+                        payload = server.run_report(unquote(match.group("property")), body)
+                except (KeyError, ValueError) as exc:
+                    server._count("status_400")
+                    self._reply(400, _error(400, "INVALID_ARGUMENT", str(exc)))
+                    return
+                server._count("status_200")
+                self._reply(200, payload)
+
+            def _reply(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug("stand-in %s - %s", self.address_string(), format % args)
+
+        return _Handler
+
+
+def _error(code: int, status: str, message: str) -> Dict[str, Any]:
+    return {"error": {"code": code, "status": status, "message": message}}
+
+
+def search_analytics_path(site_url: str) -> str:
+    return f"/webmasters/v3/sites/{quote(site_url, safe='')}/searchAnalytics/query"
+
+
+def run_report_path(property_id: str) -> str:
+    return f"/v1beta/properties/{quote(property_id, safe='')}:runReport"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local Search Console / GA4 stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="fixed:0", help="kind:a[:b] in milliseconds, e.g. lognormal:40:0.5")
+    parser.add_argument("--error-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="fraction of requests answered with 500/503")
+    parser.add_argument("--quota-per-minute", type=int, default=None)
+    parser.add_argument("--max-page-size", type=int, default=25_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    config = StandInConfig(
+        latency=LatencyModel.parse(args.latency),
+        error_rate_429=args.error_429,
+        error_rate_5xx=args.error_5xx,
+        quota_per_minute=args.quota_per_minute,
+        max_page_size=args.max_page_size,
+        seed=args.seed,
+    )
+    try:
+        StandInServer(config, args.host, args.port).serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+__all__ = [
+    "LatencyModel",
+    "StandInConfig",
+    "StandInServer",
+    "run_report_path",
+    "search_analytics_path",
+]
+
+
+if __name__ == "__main__":
+    main()
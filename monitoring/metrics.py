@@ -0,0 +1,486 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are registered on a ``MetricsRegistry``
+(the module level ``REGISTRY`` is used by the built-in instrumentation).
+Recording is a no-op while the registry is disabled so the instrumented
+hot paths only pay for an attribute lookup and a branch.
+
+Enable collection with ``REGISTRY.enable()``, the ``CKT_METRICS=1``
+environment variable or the ``metrics.enabled`` settings key, and expose
+the samples locally with ``serve_metrics()``. Short-lived processes can
+instead leave a snapshot for node_exporter's textfile collector with
+``write_metrics()``.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class _NullTimer:
+    """Shared timer returned while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: "_HistogramChild") -> None:
+        self._child = child
+        self._start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class _CounterChild:
+    __slots__ = ("_registry", "_lock", "value")
+
+    def __init__(self, registry: "MetricsRegistry") -> None:
+        self._registry = registry
+        self._lock = Lock()
+        self.value = 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        if not self._registry.enabled:
+            return
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("_registry", "_lock", "value")
+
+    def __init__(self, registry: "MetricsRegistry") -> None:
+        self._registry = registry
+        self._lock = Lock()
+        self.value = 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self.value = 0.0
+
+    def set(self, value: float) -> None:
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    __slots__ = ("_registry", "_lock", "_upper_bounds", "bucket_counts", "sum", "count")
+
+    def __init__(self, registry: "MetricsRegistry", upper_bounds: Sequence[float]) -> None:
+        self._registry = registry
+        self._lock = Lock()
+        self._upper_bounds = upper_bounds
+        # Bucket cuối cùng là +Inf
+        self.bucket_counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self.bucket_counts = [0] * len(self.bucket_counts)
+            self.sum = 0.0
+            self.count = 0
+
+    def observe(self, value: float) -> None:
+        if not self._registry.enabled:
+            return
+        index = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer | _NullTimer:
+        """Context manager observing the elapsed wall time in seconds."""
+        if not self._registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> Any:
+        """Return the child series for ``values``; cache it on hot paths."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        child = self._children.get(values)
+        if child is None:
+            key = tuple(str(value) for value in values)
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self) -> Any:
+        if self.labelnames:
+            raise ValueError(f"{self.name} requires labels {self.labelnames}")
+        return self._default
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+    def _label_dict(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild(self._registry)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for key, child in list(self._children.items()):
+            yield f"{self.name}_total", self._label_dict(key), child.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild(self._registry)
+
+    def set(self, value: float) -> None:
+        self._unlabelled().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._unlabelled().dec(amount)
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for key, child in list(self._children.items()):
+            yield self.name, self._label_dict(key), child.value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+        super().__init__(registry, name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self._registry, self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._unlabelled().observe(value)
+
+    def time(self) -> _Timer | _NullTimer:
+        return self._unlabelled().time()
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for key, child in list(self._children.items()):
+            labels = self._label_dict(key)
+            cumulative = 0
+            bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, child.bucket_counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": bound}, cumulative
+            yield f"{self.name}_sum", labels, child.sum
+            yield f"{self.name}_count", labels, child.count
+
+
+class MetricsRegistry:
+    """Collection of named metrics that renders the Prometheus text format."""
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def _register(self, cls: type, name: str, documentation: str, labelnames: Sequence[str], **kwargs: Any) -> Any:
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, cls) or existing.labelnames != tuple(labelnames):
+                    raise ValueError(f"Metric {name} already registered with a different type or labels")
+                return existing
+            metric = cls(self, name, documentation, labelnames, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def sample_value(self, name: str, labels: Optional[Dict[str, str]] = None) -> Optional[float]:
+        """Return a single exposed sample, mainly useful for tests and debugging."""
+        labels = labels or {}
+        for metric in list(self._metrics.values()):
+            for sample_name, sample_labels, value in metric.samples():
+                if sample_name == name and sample_labels == labels:
+                    return value
+        return None
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Call ``collector`` before every ``render()``, e.g. to refresh gauges from a database."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def reset(self) -> None:
+        """Zero every series in place; children cached by call sites stay valid."""
+        for metric in list(self._metrics.values()):
+            for child in list(metric._children.values()):
+                child.clear()
+
+    def render(self) -> str:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector %r failed", collector)
+        lines: List[str] = []
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+    return "{" + inner + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry(enabled=os.environ.get("CKT_METRICS", "").lower() in {"1", "true", "yes", "on"})
+
+# Dùng chung cho mọi client gọi ra bên ngoài (Search Console, GA4, WebFetcher)
+UPSTREAM_REQUEST_SECONDS = REGISTRY.histogram(
+    "ckt_upstream_request_seconds",
+    "Latency of upstream API and HTTP calls.",
+    ("client", "method"),
+)
+
+
+class MetricsServer:
+    """Background HTTP server exposing ``/metrics`` for a registry."""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9108) -> None:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - http.server API
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug("metrics %s - %s", self.address_string(), format % args)
+
+        self.registry = registry
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        host, port = self._httpd.server_address[:2]
+        return str(host), int(port)
+
+    def start(self) -> "MetricsServer":
+        if self._thread is None:
+            # poll_interval ngắn để stop() không chặn tiến trình ngắn hạn tới 0.5s
+            self._thread = Thread(
+                target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, name="ckt-metrics", daemon=True
+            )
+            self._thread.start()
+            logger.info("Serving metrics on http://%s:%s/metrics", *self.address)
+        return self
+
+    def serve_forever(self) -> None:
+        logger.info("Serving metrics on http://%s:%s/metrics", *self.address)
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def serve_metrics(
+    host: str = "127.0.0.1",
+    port: int = 9108,
+    registry: MetricsRegistry = REGISTRY,
+) -> MetricsServer:
+    """Enable ``registry`` and start serving it on ``http://host:port/metrics``."""
+    registry.enable()
+    return MetricsServer(registry, host, port).start()
+
+
+def write_metrics(path: str | Path, registry: MetricsRegistry = REGISTRY) -> Path:
+    """Atomically write the exposition text to ``path`` (node_exporter textfile format)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(registry.render(), encoding="utf-8")
+    # Đổi tên nguyên tử để collector không bao giờ đọc tệp ghi dở
+    os.replace(tmp, path)
+    return path
+
+
+def configure_metrics(settings: Dict[str, Any], registry: MetricsRegistry = REGISTRY) -> Optional[MetricsServer]:
+    """Apply a ``metrics`` settings block; start the endpoint when a port is set."""
+    if not settings.get("enabled"):
+        return None
+    registry.enable()
+    port = settings.get("port")
+    if port is None:
+        return None
+    return serve_metrics(settings.get("host", "127.0.0.1"), int(port), registry)
+
+
+__all__ = [
+    "Counter",
+    "DEFAULT_BUCKETS",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "MetricsServer",
+    "REGISTRY",
+    "UPSTREAM_REQUEST_SECONDS",
+    "configure_metrics",
+    "serve_metrics",
+    "write_metrics",
+]
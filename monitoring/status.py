@@ -0,0 +1,48 @@
+"""Gauges describing the database state, for the standalone metrics exporter.
+
+CLI runs are short-lived, so their own counters vanish with the process
+(see ``--metrics-file``). ``register_database_gauges`` exposes what those
+runs leave behind instead: how many keywords are tracked, when they were
+last crawled, how much content is waiting or overdue and when the last
+report was generated. The gauges are refreshed on every scrape.
+"""
+from __future__ import annotations
+
+from calendar import timegm
+from datetime import datetime
+from typing import Optional
+
+from monitoring.metrics import REGISTRY, MetricsRegistry
+from storage.database import Database
+
+
+def _epoch(iso: Optional[str]) -> float:
+    if not iso:
+        return 0.0
+    # Chuỗi không có múi giờ được coi là UTC, như ở phần còn lại của dự án
+    return float(timegm(datetime.fromisoformat(iso).utctimetuple()))
+
+
+def register_database_gauges(database: Database, registry: MetricsRegistry = REGISTRY) -> None:
+    tracked = registry.gauge("ckt_keywords_tracked", "Keywords with at least one stored ranking.")
+    last_crawl = registry.gauge(
+        "ckt_last_crawl_timestamp_seconds", "Newest fetched_at across tracked keywords (0 if none)."
+    )
+    content = registry.gauge("ckt_content_pending", "Scheduled content not yet posted, by state.", ("state",))
+    last_report = registry.gauge(
+        "ckt_last_report_timestamp_seconds", "Newest traffic report generated_at (0 if none)."
+    )
+    waiting, overdue = content.labels("waiting"), content.labels("overdue")
+
+    def collect() -> None:
+        status = database.fetch_status()
+        tracked.set(status["tracked_keywords"])
+        last_crawl.set(_epoch(status["last_crawled_at"]))
+        waiting.set(status["pending_content"] - status["overdue_content"])
+        overdue.set(status["overdue_content"])
+        last_report.set(_epoch(status["last_report_at"]))
+
+    registry.add_collector(collect)
+
+
+__all__ = ["register_database_gauges"]
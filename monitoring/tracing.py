@@ -0,0 +1,321 @@
+"""Opt-in tracing spans and a sampling stack profiler.
+
+Spans nest per thread (``crawl.batch`` -> ``crawl.keyword`` ->
+``crawl.fetch``/``crawl.upsert`` -> ``db.*``) and finished spans are kept
+in a bounded ring buffer. ``Tracer.flush()`` writes them as a Chrome
+trace-event JSON file that opens in ``chrome://tracing`` or Perfetto.
+
+``SamplingProfiler`` periodically snapshots every thread's Python stack
+and writes collapsed stacks (``frame;frame;frame count``) that
+``flamegraph.pl`` or speedscope read directly.
+
+Nothing is recorded unless enabled through ``CKT_TRACE=1`` /
+``CKT_PROFILE=<file>`` or the ``tracing`` settings block; a disabled
+``span()`` returns a shared no-op context manager.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    start: float
+    duration: float
+    depth: int
+    parent: Optional[str]
+    thread_id: int
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_tracer", "name", "attrs", "_start", "_wall", "_depth", "_parent")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any]) -> None:
+        self._tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self._start = 0.0
+        self._wall = 0.0
+        self._depth = 0
+        self._parent: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attrs[key] = value
+
+    def __enter__(self) -> "_Span":
+        stack = self._tracer._stack()
+        self._depth = len(stack)
+        self._parent = stack[-1].name if stack else None
+        stack.append(self)
+        self._wall = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        duration = time.perf_counter() - self._start
+        stack = self._tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self._tracer._record(
+            SpanRecord(
+                self.name,
+                self._wall,
+                duration,
+                self._depth,
+                self._parent,
+                threading.get_ident(),
+                self.attrs,
+            )
+        )
+
+
+class Tracer:
+    """Records nested spans into an in-process ring buffer."""
+
+    def __init__(self, enabled: bool = False, ring_size: int = 10_000, trace_file: str | Path | None = None) -> None:
+        self.enabled = enabled
+        self.trace_file = Path(trace_file) if trace_file else None
+        self._spans: Deque[SpanRecord] = deque(maxlen=max(1, ring_size))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, record: SpanRecord) -> None:
+        with self._lock:
+            self._spans.append(record)
+
+    def span(self, name: str, **attrs: Any) -> _Span | _NullSpan:
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def configure(
+        self,
+        enabled: bool,
+        ring_size: Optional[int] = None,
+        trace_file: str | Path | None = None,
+    ) -> None:
+        with self._lock:
+            if ring_size is not None and ring_size != self._spans.maxlen:
+                self._spans = deque(self._spans, maxlen=max(1, ring_size))
+            if trace_file:
+                self.trace_file = Path(trace_file)
+        self.enabled = enabled
+
+    def spans(self) -> List[SpanRecord]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def to_trace_events(self) -> List[Dict[str, Any]]:
+        pid = os.getpid()
+        return [
+            {
+                "name": record.name,
+                "ph": "X",
+                "ts": record.start * 1_000_000,
+                "dur": record.duration * 1_000_000,
+                "pid": pid,
+                "tid": record.thread_id,
+                "args": {key: _jsonable(value) for key, value in record.attrs.items()},
+            }
+            for record in self.spans()
+        ]
+
+    def flush(self, path: str | Path | None = None) -> Optional[Path]:
+        """Write buffered spans as Chrome trace-event JSON; returns the path."""
+        target = Path(path) if path else self.trace_file
+        if target is None:
+            return None
+        target.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"traceEvents": self.to_trace_events(), "displayTimeUnit": "ms"}
+        target.write_text(json.dumps(payload), encoding="utf-8")
+        logger.info("Wrote %s spans to %s", len(payload["traceEvents"]), target)
+        return target
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class SamplingProfiler:
+    """Background sampler that aggregates Python stacks into collapsed format."""
+
+    def __init__(self, interval: float = 0.005, output: str | Path | None = None) -> None:
+        self.interval = max(0.0005, interval)
+        self.output = Path(output) if output else None
+        self.samples: _Counter[str] = _Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> "SamplingProfiler":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ckt-profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                    frame = frame.f_back
+                if not parts:
+                    continue
+                thread_name = names.get(thread_id)
+                if thread_name is None:
+                    thread = next((t for t in threading.enumerate() if t.ident == thread_id), None)
+                    thread_name = names[thread_id] = thread.name if thread else str(thread_id)
+                parts.append(thread_name)
+                self.samples[";".join(reversed(parts))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def write_collapsed(self, path: str | Path | None = None) -> Optional[Path]:
+        target = Path(path) if path else self.output
+        if target is None:
+            return None
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(self.collapsed(), encoding="utf-8")
+        logger.info("Wrote %s profile samples to %s", sum(self.samples.values()), target)
+        return target
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+        self.write_collapsed()
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").lower() in {"1", "true", "yes", "on"}
+
+
+TRACER = Tracer(
+    enabled=_env_flag("CKT_TRACE"),
+    ring_size=int(os.environ.get("CKT_TRACE_RING", "10000")),
+    trace_file=os.environ.get("CKT_TRACE_FILE") or None,
+)
+_PROFILER: Optional[SamplingProfiler] = None
+
+
+def span(name: str, **attrs: Any) -> _Span | _NullSpan:
+    """Open a span on the process-wide tracer; a no-op while tracing is off."""
+    if not TRACER.enabled:
+        return _NULL_SPAN
+    return _Span(TRACER, name, attrs)
+
+
+def start_profiler(output: str | Path, interval: float = 0.005) -> SamplingProfiler:
+    """Start the process-wide sampler; collapsed stacks are written at exit."""
+    global _PROFILER
+    if _PROFILER is None:
+        _PROFILER = SamplingProfiler(interval, output).start()
+    return _PROFILER
+
+
+def stop_profiler() -> Optional[Path]:
+    global _PROFILER
+    if _PROFILER is None:
+        return None
+    profiler, _PROFILER = _PROFILER, None
+    profiler.stop()
+    return profiler.write_collapsed()
+
+
+def configure_tracing(settings: Dict[str, Any]) -> None:
+    """Apply a ``tracing`` settings block (``enabled``, ``ring_size``, ``trace_file``,
+    ``profile_file``, ``profile_interval``)."""
+    if settings.get("enabled"):
+        TRACER.configure(True, settings.get("ring_size"), settings.get("trace_file"))
+    if settings.get("profile_file"):
+        start_profiler(settings["profile_file"], float(settings.get("profile_interval", 0.005)))
+
+
+def _flush_at_exit() -> None:
+    try:
+        if TRACER.enabled and TRACER.trace_file is not None:
+            TRACER.flush()
+        stop_profiler()
+    except Exception:
+        logger.exception("Failed to write trace output at exit")
+
+
+if os.environ.get("CKT_PROFILE"):
+    start_profiler(os.environ["CKT_PROFILE"], float(os.environ.get("CKT_PROFILE_INTERVAL", "0.005")))
+
+atexit.register(_flush_at_exit)
+
+
+__all__ = [
+    "SamplingProfiler",
+    "SpanRecord",
+    "TRACER",
+    "Tracer",
+    "configure_tracing",
+    "span",
+    "start_profiler",
+    "stop_profiler",
+]
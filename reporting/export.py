@@ -10,21 +10,45 @@ import logging
 from pathlib import Path
 from typing import Iterable, Optional
 
-from storage.database import Database, KeywordRanking, TrafficReport
+from monitoring.metrics import REGISTRY
+from monitoring.tracing import span
+from storage.database import Database, KeywordRanking, TrafficReport, record_to_dict
+from storage.rankings import RankingStore
 
 
 logger = logging.getLogger(__name__)
 
+_EXPORT_SECONDS = REGISTRY.histogram(
+    "ckt_export_seconds",
+    "Wall time of export_* calls, including the database fetch.",
+    ("export",),
+)
+_EXPORTED_ROWS = REGISTRY.counter(
+    "ckt_export_rows",
+    "Rows written by export_* calls; divide by ckt_export_seconds_sum for throughput.",
+    ("export",),
+)
+
 
 def _ensure_parent(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
 def export_keyword_rankings(
-    db: Database,
+    db: RankingStore,
     out_path: str | Path,
     keyword: Optional[str] = None,
     newline_delimited: bool = False,
+) -> Path:
+    with span("export.keyword_rankings"), _EXPORT_SECONDS.labels("keyword_rankings").time():
+        return _export_keyword_rankings(db, out_path, keyword, newline_delimited)
+
+
+def _export_keyword_rankings(
+    db: RankingStore,
+    out_path: str | Path,
+    keyword: Optional[str],
+    newline_delimited: bool,
 ) -> Path:
     path = Path(out_path)
     _ensure_parent(path)
@@ -33,10 +57,11 @@ def export_keyword_rankings(
         if newline_delimited:
             with path.open("w", encoding="utf-8") as f:
                 for row in rows:
-                    f.write(json.dumps(row.__dict__, ensure_ascii=False) + "\n")
+                    f.write(json.dumps(record_to_dict(row), ensure_ascii=False) + "\n")
         else:
-            payload = [row.__dict__ for row in rows]
+            payload = [record_to_dict(row) for row in rows]
             path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        _EXPORTED_ROWS.labels("keyword_rankings").inc(len(rows))
         logger.info("Exported %s keyword ranking rows to %s", len(rows), path)
     except Exception:
         logger.exception("Failed to export keyword rankings to %s", path)
@@ -49,6 +74,11 @@ def export_reports(
     out_path: str | Path,
     newline_delimited: bool = False,
 ) -> Path:
+    with span("export.reports"), _EXPORT_SECONDS.labels("reports").time():
+        return _export_reports(db, out_path, newline_delimited)
+
+
+def _export_reports(db: Database, out_path: str | Path, newline_delimited: bool) -> Path:
     path = Path(out_path)
     _ensure_parent(path)
     rows = db.fetch_reports()
@@ -56,10 +86,11 @@ def export_reports(
         if newline_delimited:
             with path.open("w", encoding="utf-8") as f:
                 for row in rows:
-                    f.write(json.dumps(row.__dict__, ensure_ascii=False) + "\n")
+                    f.write(json.dumps(record_to_dict(row), ensure_ascii=False) + "\n")
         else:
-            payload = [row.__dict__ for row in rows]
+            payload = [record_to_dict(row) for row in rows]
             path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        _EXPORTED_ROWS.labels("reports").inc(len(rows))
         logger.info("Exported %s reports to %s", len(rows), path)
     except Exception:
         logger.exception("Failed to export reports to %s", path)
@@ -1,14 +1,40 @@
-"""Pipeline báo cáo tổng hợp lưu lượng và số liệu truy vấn."""
+"""Pipeline báo cáo tổng hợp lưu lượng và số liệu truy vấn.
+
+Reports are cached per ``(start, end)`` in ``traffic_reports``. A range
+whose end is more than ``open_window_days`` before today is closed: its
+numbers no longer change, so once it has been generated after closing it
+is served from storage forever. Open ranges are recomputed when their
+stored copy is older than ``stale_after_seconds``.
+"""
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime, timedelta
 from statistics import mean
-from typing import List
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 from integrations.ga4 import GA4Client
 from integrations.search_console import SearchConsoleClient
-from storage.database import Database
+from monitoring.metrics import REGISTRY
+from monitoring.tracing import span
+from storage.database import Database, TrafficReport
+from storage.sketches import ALL_SEGMENTS
+
+
+_CACHE_REQUESTS = REGISTRY.counter(
+    "ckt_report_cache_requests",
+    "ReportingPipeline.generate calls answered from storage (hit) or recomputed (miss).",
+    ("result",),
+)
+_CACHE_HIT = _CACHE_REQUESTS.labels("hit")
+_CACHE_MISS = _CACHE_REQUESTS.labels("miss")
+
+# Search Console còn chỉnh sửa số liệu của vài ngày gần nhất
+DEFAULT_OPEN_WINDOW_DAYS = 3
+DEFAULT_STALE_AFTER_SECONDS = 3600
+DEFAULT_QUANTILES = (0.5, 0.9)
+# Nhóm vị trí quen thuộc: top 3, trang 1, trang 2, top 50, phần còn lại
+DEFAULT_POSITION_BINS = (1.0, 4.0, 11.0, 21.0, 51.0, 101.0)
 
 
 @dataclass
@@ -21,17 +47,105 @@ class ReportSummary:
     new_users: int
     returning_users: int
     report_id: int | None = None
+    generated_at: str | None = None
+    cached: bool = False
+
+    @classmethod
+    def from_report(cls, report: TrafficReport, cached: bool = False) -> "ReportSummary":
+        return cls(
+            report.start_date,
+            report.end_date,
+            report.total_clicks,
+            report.total_impressions,
+            report.average_position,
+            report.new_users,
+            report.returning_users,
+            report.id,
+            report.generated_at,
+            cached,
+        )
+
+
+@dataclass
+class PositionDistribution:
+    start_date: str
+    end_date: str
+    segment: str
+    count: int
+    mean_position: Optional[float]
+    quantiles: Dict[float, float]
+    # (cận dưới, cận trên, số lượng ước tính) cho mỗi khoảng [dưới, trên)
+    histogram: List[Tuple[float, float, float]]
+
+
+@dataclass
+class ReportCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
 
 
 class ReportingPipeline:
-    def __init__(self, ga_client: GA4Client, sc_client: SearchConsoleClient, database: Database) -> None:
+    def __init__(
+        self,
+        ga_client: GA4Client,
+        sc_client: SearchConsoleClient,
+        database: Database,
+        open_window_days: int = DEFAULT_OPEN_WINDOW_DAYS,
+        stale_after_seconds: float = DEFAULT_STALE_AFTER_SECONDS,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
         self.ga_client = ga_client
         self.sc_client = sc_client
         self.database = database
+        self.open_window_days = max(0, open_window_days)
+        self.stale_after = timedelta(seconds=max(0.0, stale_after_seconds))
+        self.clock = clock
+        self.cache_stats = ReportCacheStats()
+
+    def is_closed(self, end: date, as_of: Optional[datetime] = None) -> bool:
+        """Whether data up to ``end`` is final as of ``as_of`` (default now)."""
+        as_of = as_of or self.clock()
+        return end < as_of.date() - timedelta(days=self.open_window_days)
+
+    def _is_fresh(self, report: TrafficReport, end: date, now: datetime) -> bool:
+        if not report.generated_at:
+            return False
+        generated_at = datetime.fromisoformat(report.generated_at)
+        if self.is_closed(end, generated_at):
+            return True
+        # Tạo khi khoảng còn mở: số liệu đã đóng từ đó thì phải tính lại một lần
+        return not self.is_closed(end, now) and now - generated_at < self.stale_after
+
+    def generate(self, start: date, end: date, force: bool = False) -> ReportSummary:
+        """Return the report for ``start``..``end``, from storage when it is still valid.
 
-    def generate(self, start: date, end: date) -> ReportSummary:
-        search_rows = self.sc_client.fetch_query_metrics(start, end)
-        traffic_rows = self.ga_client.fetch_traffic_metrics(start, end)
+        ``force=True`` always recomputes and overwrites the stored copy.
+        """
+        with span("report.generate", start=start.isoformat(), end=end.isoformat()) as current:
+            now = self.clock()
+            if not force:
+                with span("report.cache_lookup"):
+                    stored = self.database.fetch_report(start.isoformat(), end.isoformat())
+                if stored is not None and self._is_fresh(stored, end, now):
+                    self.cache_stats.hits += 1
+                    _CACHE_HIT.inc()
+                    current.set("cache", "hit")
+                    return ReportSummary.from_report(stored, cached=True)
+            self.cache_stats.misses += 1
+            _CACHE_MISS.inc()
+            current.set("cache", "miss")
+            return self._generate(start, end, now)
+
+    def _generate(self, start: date, end: date, now: datetime) -> ReportSummary:
+        with span("report.fetch_search_console"):
+            search_rows = self.sc_client.fetch_query_metrics(start, end)
+        with span("report.fetch_ga4"):
+            traffic_rows = self.ga_client.fetch_traffic_metrics(start, end)
 
         total_clicks = sum(row["clicks"] for row in search_rows)
         total_impressions = sum(row["impressions"] for row in search_rows)
@@ -47,26 +161,41 @@ class ReportingPipeline:
             "average_position": float(round(avg_position, 2)),
             "new_users": int(new_users),
             "returning_users": int(returning_users),
+            "generated_at": now.isoformat(timespec="seconds"),
         }
-        report_id = self.database.insert_report(summary_dict)
+        report_id = self.database.upsert_report(summary_dict)
         summary_dict["report_id"] = report_id
         return ReportSummary(**summary_dict)
 
+    def position_distribution(
+        self,
+        start: date,
+        end: date,
+        segment: str = ALL_SEGMENTS,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+        bins: Sequence[float] = DEFAULT_POSITION_BINS,
+    ) -> PositionDistribution:
+        """Ranking position distribution over ``start``..``end`` from stored sketches.
+
+        Per-day t-digests written by the crawl path are merged, so the raw
+        rankings are never scanned. ``segment`` is a URL group such as
+        ``/blog`` (see ``Database.fetch_sketch_segments``) or all URLs.
+        """
+        with span("report.position_distribution", start=start.isoformat(), end=end.isoformat(), segment=segment):
+            digest = self.database.fetch_position_sketch(start.isoformat(), end.isoformat(), segment)
+        values = {q: digest.quantile(q) for q in quantiles}
+        return PositionDistribution(
+            start.isoformat(),
+            end.isoformat(),
+            segment,
+            digest.count,
+            digest.mean(),
+            {q: value for q, value in values.items() if value is not None},
+            list(zip(bins, bins[1:], digest.histogram(bins))) if digest.count else [],
+        )
+
     def list_reports(self) -> List[ReportSummary]:
-        reports = self.database.fetch_reports()
-        return [
-            ReportSummary(
-                report.start_date,
-                report.end_date,
-                report.total_clicks,
-                report.total_impressions,
-                report.average_position,
-                report.new_users,
-                report.returning_users,
-                report.id,
-            )
-            for report in reports
-        ]
-
-
-__all__ = ["ReportingPipeline", "ReportSummary"]
+        return [ReportSummary.from_report(report) for report in self.database.fetch_reports()]
+
+
+__all__ = ["PositionDistribution", "ReportCacheStats", "ReportingPipeline", "ReportSummary"]
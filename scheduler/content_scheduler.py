@@ -1,14 +1,27 @@
 """Tiện ích lập lịch nội dung để theo dõi quy trình xuất bản."""
 from __future__ import annotations
 
+import heapq
+import logging
 from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timezone
+from threading import Condition, Thread
+from typing import Callable, List, Optional, Tuple
 
-from storage.database import Database
+from storage.database import Database, ScheduledContent
 
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+
+def _utc_iso(value: datetime) -> str:
+    """ISO string in naive UTC, the single form stored and compared for ``publish_at``."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="seconds")
+
+
+@dataclass(slots=True)
 class ScheduledPost:
     id: int
     title: str
@@ -16,39 +29,184 @@ class ScheduledPost:
     publish_at: str
     status: str
 
+    @classmethod
+    def from_content(cls, content: ScheduledContent) -> "ScheduledPost":
+        return cls(content.id, content.title, content.author, content.publish_at, content.status)
+
 
 class ContentScheduler:
     """Quản lý vòng đời nội dung từ lập kế hoạch đến xuất bản."""
 
     def __init__(self, database: Database) -> None:
         self.database = database
+        self._listeners: List[Callable[[ScheduledPost], None]] = []
+
+    def add_listener(self, listener: Callable[[ScheduledPost], None]) -> None:
+        """Register a callback invoked with every post created by ``schedule_post``."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[ScheduledPost], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
 
     def schedule_post(self, title: str, author: str, publish_at: datetime) -> ScheduledPost:
+        """Store a post; a timezone-aware ``publish_at`` is converted to naive UTC first."""
+        # Heap, SQL và thời gian chờ đều so sánh cùng một chuỗi UTC không múi giờ
+        publish_at_iso = _utc_iso(publish_at)
         post_id = self.database.add_content(
             title=title,
             author=author,
-            publish_at=publish_at.isoformat(timespec="seconds"),
+            publish_at=publish_at_iso,
             status="Scheduled",
         )
-        return ScheduledPost(post_id, title, author, publish_at.isoformat(timespec="seconds"), "Scheduled")
+        post = ScheduledPost(post_id, title, author, publish_at_iso, "Scheduled")
+        for listener in list(self._listeners):
+            listener(post)
+        return post
 
     def list_posts(self, status: Optional[str] = None) -> List[ScheduledPost]:
         posts = self.database.fetch_content(status)
-        return [ScheduledPost(**post.__dict__) for post in posts]
+        return [ScheduledPost.from_content(post) for post in posts]
+
+    def pending_posts(self) -> List[ScheduledPost]:
+        posts = self.database.fetch_unposted_content()
+        return [ScheduledPost.from_content(post) for post in posts]
 
     def due_posts(self, now: Optional[datetime] = None) -> List[ScheduledPost]:
         now = now or datetime.utcnow()
-        due = self.database.fetch_due_content(now.isoformat(timespec="seconds"))
-        return [ScheduledPost(**post.__dict__) for post in due]
+        due = self.database.fetch_due_content(_utc_iso(now))
+        return [ScheduledPost.from_content(post) for post in due]
 
     def mark_posted(self, post_id: int) -> None:
         self.database.update_content_status(post_id, "Posted")
 
     def run_due(self, now: Optional[datetime] = None) -> List[ScheduledPost]:
-        due = self.due_posts(now)
-        for post in due:
-            self.mark_posted(post.id)
-        return due
+        """Mark every due post as ``Posted`` with one set-based UPDATE and return them."""
+        now = now or datetime.utcnow()
+        posted = self.database.mark_due_content_posted(_utc_iso(now))
+        return [ScheduledPost.from_content(post) for post in posted]
+
+
+class ContentPublisher:
+    """Event-driven runner that publishes posts at their ``publish_at`` time.
+
+    Upcoming publish times are loaded once into a min-heap and kept up to
+    date through ``ContentScheduler.add_listener``; the worker thread sleeps
+    on a condition until the earliest entry is due (or a new post arrives),
+    then calls ``ContentScheduler.run_due``. While idle the database is only
+    touched every ``resync_seconds`` to pick up posts written by other
+    processes (``None`` disables the resync).
+    """
+
+    def __init__(
+        self,
+        scheduler: ContentScheduler,
+        on_posted: Optional[Callable[[List[ScheduledPost]], None]] = None,
+        resync_seconds: Optional[float] = 300.0,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self.scheduler = scheduler
+        self.on_posted = on_posted
+        self.resync_seconds = resync_seconds
+        self.clock = clock
+        self._heap: List[Tuple[str, int]] = []
+        self._condition = Condition()
+        self._running = False
+        self._thread: Optional[Thread] = None
+
+    # Quản lý heap ----------------------------------------------------------------
+    def load(self) -> None:
+        pending = self.scheduler.pending_posts()
+        with self._condition:
+            self._heap = [(post.publish_at, post.id) for post in pending]
+            heapq.heapify(self._heap)
+            self._condition.notify_all()
+
+    def _on_scheduled(self, post: ScheduledPost) -> None:
+        with self._condition:
+            heapq.heappush(self._heap, (post.publish_at, post.id))
+            self._condition.notify_all()
+
+    def next_publish_at(self) -> Optional[datetime]:
+        with self._condition:
+            if not self._heap:
+                return None
+            return datetime.fromisoformat(self._heap[0][0])
+
+    # Xuất bản ------------------------------------------------------------------
+    def publish_due(self, now: Optional[datetime] = None) -> List[ScheduledPost]:
+        now = now or self.clock()
+        now_iso = _utc_iso(now)
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now_iso:
+                heapq.heappop(self._heap)
+        posted = self.scheduler.run_due(now)
+        if posted:
+            logger.info("Published %s scheduled posts", len(posted))
+            if self.on_posted is not None:
+                try:
+                    self.on_posted(posted)
+                except Exception:
+                    logger.exception("on_posted callback failed")
+        return posted
+
+    # Vòng lặp nền ---------------------------------------------------------------
+    def start(self) -> "ContentPublisher":
+        if self._thread is not None:
+            return self
+        self.scheduler.add_listener(self._on_scheduled)
+        self.load()
+        self._running = True
+        self._thread = Thread(target=self._run, name="ckt-content-publisher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self.scheduler.remove_listener(self._on_scheduled)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _seconds_until_next(self) -> Optional[float]:
+        if not self._heap:
+            return None
+        due_at = datetime.fromisoformat(self._heap[0][0])
+        return (due_at - self.clock()).total_seconds()
+
+    def _wait_for_work(self, last_sync: datetime) -> bool:
+        """Block until a post is due or a resync is needed; ``False`` once stopped."""
+        with self._condition:
+            while self._running:
+                wait = self._seconds_until_next()
+                if wait is not None and wait <= 0:
+                    break
+                if self.resync_seconds is not None:
+                    until_sync = self.resync_seconds - (self.clock() - last_sync).total_seconds()
+                    if until_sync <= 0:
+                        break
+                    wait = until_sync if wait is None else min(wait, until_sync)
+                self._condition.wait(timeout=wait)
+            return self._running
 
+    def _run(self) -> None:
+        last_sync = self.clock()
+        while True:
+            # Mọi lỗi, kể cả khi tính thời gian chờ, chỉ được ghi log: luồng không được chết lặng lẽ
+            try:
+                if not self._wait_for_work(last_sync):
+                    return
+                if self.resync_seconds is not None and (
+                    (self.clock() - last_sync).total_seconds() >= self.resync_seconds
+                ):
+                    self.load()
+                    last_sync = self.clock()
+                self.publish_due()
+            except Exception:
+                logger.exception("Content publisher iteration failed")
+                with self._condition:
+                    self._condition.wait(timeout=1.0)
 
-__all__ = ["ContentScheduler", "ScheduledPost"]
+__all__ = ["ContentPublisher", "ContentScheduler", "ScheduledPost"]
@@ -1,25 +1,156 @@
 """Job scheduler built on APScheduler's BackgroundScheduler.
 
-Provides a simple interface to schedule crawling jobs and pause/resume
-them dynamically at runtime.
+Jobs are registered by name and belong to a job class (crawl, report,
+export, publish, cpu). Each class runs on its own executor, sized
+independently, with per-job overlap and misfire policy: by default a job
+that is still running when its next run is due is skipped rather than
+started a second time. Jobs can be paused and resumed individually or by
+group, and each job keeps run-duration and skip statistics.
+
+APScheduler is imported when the first ``JobScheduler`` is created, so
+short-lived processes that only need ``JobStats``/``JobClass`` do not pay
+for it.
 """
 from __future__ import annotations
 
 import logging
-from datetime import timedelta
-from typing import Callable, Optional
+import time
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
+from monitoring.metrics import REGISTRY
 
 
 logger = logging.getLogger(__name__)
 
+# Giá trị mặc định "dùng thiết lập của job class", phân biệt với None (luôn chạy job trễ)
+_UNSET: Any = object()
+
+_JOB_SECONDS = REGISTRY.histogram(
+    "ckt_scheduler_job_seconds",
+    "Run duration of scheduled jobs.",
+    ("job",),
+)
+_JOB_SKIPPED = REGISTRY.counter(
+    "ckt_scheduler_job_skipped",
+    "Scheduled runs that did not start, by reason (still_running or missed).",
+    ("job", "reason"),
+)
+
+
+@dataclass(frozen=True)
+class JobClass:
+    """Executor and default overlap policy shared by a family of jobs."""
+
+    name: str
+    executor: str = "thread"  # "thread" hoặc "process"
+    max_workers: int = 1
+    max_instances: int = 1
+    coalesce: bool = True
+    misfire_grace_time: Optional[int] = 30
+
+
+DEFAULT_JOB_CLASSES: Dict[str, JobClass] = {
+    # Crawl dùng chung một giới hạn tốc độ nên chạy tuần tự
+    "crawl": JobClass("crawl", "thread", max_workers=1),
+    "report": JobClass("report", "thread", max_workers=2),
+    "export": JobClass("export", "thread", max_workers=2),
+    "publish": JobClass("publish", "thread", max_workers=1, misfire_grace_time=None),
+    # Công việc nặng CPU; hàm phải pickle được (định nghĩa ở cấp module)
+    "cpu": JobClass("cpu", "process", max_workers=2),
+}
+
+
+@dataclass
+class JobStats:
+    name: str
+    job_class: str
+    group: str
+    runs: int = 0
+    failures: int = 0
+    skipped_running: int = 0
+    missed: int = 0
+    last_duration: Optional[float] = None
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+
+    @property
+    def skipped(self) -> int:
+        return self.skipped_running + self.missed
+
+    @property
+    def average_duration(self) -> Optional[float]:
+        completed = self.runs + self.failures
+        return self.total_duration / completed if completed else None
+
+
+@dataclass
+class _JobRun:
+    duration: float
+    value: Any = None
+
+
+class _TimedJob:
+    """Picklable wrapper that reports the job's duration through its return value.
+
+    Measuring inside the job keeps durations exact for both thread and
+    process executors; the result travels back in ``JobExecutionEvent``.
+    """
+
+    def __init__(self, func: Callable[..., Any]) -> None:
+        self.func = func
+
+    def __call__(self, *args: Any, **kwargs: Any) -> _JobRun:
+        start = time.perf_counter()
+        try:
+            value = self.func(*args, **kwargs)
+        except BaseException as exc:
+            exc.ckt_duration = time.perf_counter() - start  # type: ignore[attr-defined]
+            raise
+        return _JobRun(time.perf_counter() - start, value)
+
+
+@dataclass
+class _Registration:
+    stats: JobStats
+    groups: List[str] = field(default_factory=list)
+
 
 class JobScheduler:
-    def __init__(self) -> None:
-        self.scheduler = BackgroundScheduler()
-        self._job_id: Optional[str] = None
+    def __init__(self, job_classes: Optional[Dict[str, JobClass]] = None) -> None:
+        from apscheduler import events
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        self._events = events
+        self.job_classes: Dict[str, JobClass] = dict(DEFAULT_JOB_CLASSES)
+        if job_classes:
+            self.job_classes.update(job_classes)
+        # Pool tiến trình chỉ được tạo khi job đầu tiên của class đó được đăng ký
+        executors = {
+            name: self._make_executor(cls) for name, cls in self.job_classes.items() if cls.executor != "process"
+        }
+        self._lazy_executors = {name for name, cls in self.job_classes.items() if cls.executor == "process"}
+        self.scheduler = BackgroundScheduler(executors=executors)
+        self.scheduler.add_listener(
+            self._on_event,
+            events.EVENT_JOB_EXECUTED
+            | events.EVENT_JOB_ERROR
+            | events.EVENT_JOB_MAX_INSTANCES
+            | events.EVENT_JOB_MISSED,
+        )
+        self._jobs: Dict[str, _Registration] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _make_executor(job_class: JobClass) -> Any:
+        from apscheduler.executors.pool import ProcessPoolExecutor, ThreadPoolExecutor
+
+        if job_class.executor == "process":
+            return ProcessPoolExecutor(max_workers=job_class.max_workers)
+        if job_class.executor == "thread":
+            return ThreadPoolExecutor(max_workers=job_class.max_workers)
+        raise ValueError(f"Unknown executor type {job_class.executor!r} for job class {job_class.name}")
 
     def start(self) -> None:
         if not self.scheduler.running:
@@ -31,34 +162,139 @@ class JobScheduler:
         except Exception:
             logger.exception("Error shutting down scheduler")
 
+    # Đăng ký job ---------------------------------------------------------------
+    def register_job(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        every_seconds: int = 60,
+        job_class: str = "crawl",
+        groups: Sequence[str] = (),
+        max_instances: Optional[int] = None,
+        coalesce: Optional[bool] = None,
+        misfire_grace_time: Optional[int] = _UNSET,
+        args: Sequence[Any] = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+    ) -> JobStats:
+        """Schedule ``func`` every ``every_seconds`` under ``name``.
+
+        Overlap and misfire settings default to the job class; pass
+        ``misfire_grace_time=None`` to always run late jobs. The job is
+        always a member of the group named after its class.
+        """
+        from apscheduler.triggers.interval import IntervalTrigger
+
+        cls = self.job_classes.get(job_class)
+        if cls is None:
+            raise ValueError(f"Unknown job class {job_class!r}; expected one of {sorted(self.job_classes)}")
+        trigger = IntervalTrigger(seconds=max(1, int(every_seconds)))
+        with self._lock:
+            if cls.name in self._lazy_executors:
+                self.scheduler.add_executor(self._make_executor(cls), cls.name)
+                self._lazy_executors.discard(cls.name)
+        self.scheduler.add_job(
+            _TimedJob(func),
+            trigger=trigger,
+            args=list(args),
+            kwargs=kwargs or {},
+            id=name,
+            name=name,
+            executor=cls.name,
+            max_instances=max_instances if max_instances is not None else cls.max_instances,
+            coalesce=coalesce if coalesce is not None else cls.coalesce,
+            misfire_grace_time=cls.misfire_grace_time if misfire_grace_time is _UNSET else misfire_grace_time,
+            # Replace existing to allow reconfiguration
+            replace_existing=True,
+        )
+        member_of = [cls.name] + [group for group in groups if group != cls.name]
+        with self._lock:
+            self._jobs[name] = _Registration(JobStats(name, cls.name, member_of[0]), member_of)
+        logger.info("Scheduled %s job %s every %ss", cls.name, name, every_seconds)
+        return self._jobs[name].stats
+
     def schedule_crawler(
         self,
         func: Callable[[], None],
         every_seconds: int = 60,
         job_id: str = "crawler_job",
     ) -> None:
-        self._job_id = job_id
-        trigger = IntervalTrigger(seconds=max(1, int(every_seconds)))
-        # Replace existing to allow reconfiguration
-        self.scheduler.add_job(func, trigger=trigger, id=job_id, replace_existing=True)
-        logger.info("Scheduled crawler job every %ss (id=%s)", every_seconds, job_id)
+        self.register_job(job_id, func, every_seconds, job_class="crawl")
+
+    def remove_job(self, name: str) -> None:
+        with self._lock:
+            self._jobs.pop(name, None)
+        try:
+            self.scheduler.remove_job(name)
+        except Exception:
+            logger.exception("Failed to remove job %s", name)
 
-    def pause(self) -> None:
-        if self._job_id:
+    def job_names(self, group: Optional[str] = None) -> List[str]:
+        with self._lock:
+            return [
+                name for name, registration in self._jobs.items() if group is None or group in registration.groups
+            ]
+
+    # Tạm dừng / tiếp tục ---------------------------------------------------------
+    def _select(self, name: Optional[str], group: Optional[str]) -> List[str]:
+        if name is not None:
+            return [name]
+        return self.job_names(group)
+
+    def pause(self, name: Optional[str] = None, group: Optional[str] = None) -> None:
+        """Pause one job, every job in ``group``, or all jobs when neither is given."""
+        for job_id in self._select(name, group):
             try:
-                self.scheduler.pause_job(self._job_id)
-                logger.info("Paused job %s", self._job_id)
+                self.scheduler.pause_job(job_id)
+                logger.info("Paused job %s", job_id)
             except Exception:
-                logger.exception("Failed to pause job %s", self._job_id)
+                logger.exception("Failed to pause job %s", job_id)
 
-    def resume(self) -> None:
-        if self._job_id:
+    def resume(self, name: Optional[str] = None, group: Optional[str] = None) -> None:
+        """Resume one job, every job in ``group``, or all jobs when neither is given."""
+        for job_id in self._select(name, group):
             try:
-                self.scheduler.resume_job(self._job_id)
-                logger.info("Resumed job %s", self._job_id)
+                self.scheduler.resume_job(job_id)
+                logger.info("Resumed job %s", job_id)
             except Exception:
-                logger.exception("Failed to resume job %s", self._job_id)
+                logger.exception("Failed to resume job %s", job_id)
+
+    # Thống kê ------------------------------------------------------------------
+    def stats(self, name: str) -> JobStats:
+        with self._lock:
+            return self._jobs[name].stats
+
+    def all_stats(self) -> Dict[str, JobStats]:
+        with self._lock:
+            return {name: registration.stats for name, registration in self._jobs.items()}
 
+    def _on_event(self, event: Any) -> None:
+        events = self._events
+        with self._lock:
+            registration = self._jobs.get(event.job_id)
+            if registration is None:
+                return
+            stats = registration.stats
+            if event.code == events.EVENT_JOB_MAX_INSTANCES:
+                stats.skipped_running += 1
+                _JOB_SKIPPED.labels(event.job_id, "still_running").inc()
+                return
+            if event.code == events.EVENT_JOB_MISSED:
+                stats.missed += 1
+                _JOB_SKIPPED.labels(event.job_id, "missed").inc()
+                return
+            if event.code == events.EVENT_JOB_EXECUTED:
+                stats.runs += 1
+                retval = getattr(event, "retval", None)
+                duration = retval.duration if isinstance(retval, _JobRun) else None
+            else:
+                stats.failures += 1
+                duration = getattr(getattr(event, "exception", None), "ckt_duration", None)
+            if duration is not None:
+                stats.last_duration = duration
+                stats.total_duration += duration
+                stats.max_duration = max(stats.max_duration, duration)
+        if duration is not None:
+            _JOB_SECONDS.labels(event.job_id).observe(duration)
 
-__all__ = ["JobScheduler"]
 
+__all__ = ["DEFAULT_JOB_CLASSES", "JobClass", "JobScheduler", "JobStats"]
@@ -1,14 +1,44 @@
 """Lớp lưu trữ nhẹ dựa trên SQLite cho dữ liệu của crawler, bộ lập lịch và báo cáo."""
 from __future__ import annotations
 
+import re
 import sqlite3
 from contextlib import contextmanager
-from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from threading import RLock
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import Dict, Iterator, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
+from monitoring.metrics import REGISTRY
+from monitoring.tracing import span
+from storage.sketches import ALL_SEGMENTS, TDigest, url_group
 
-@dataclass
+
+_STATEMENT_SECONDS = REGISTRY.histogram(
+    "ckt_db_statement_seconds",
+    "Latency of Database operations including the commit.",
+    ("operation",),
+)
+_ROWS_WRITTEN = REGISTRY.counter(
+    "ckt_db_rows_written",
+    "Rows inserted or updated by Database, per table.",
+    ("table",),
+)
+_RANKING_ROWS_WRITTEN = _ROWS_WRITTEN.labels("keyword_rankings")
+_CONTENT_ROWS_WRITTEN = _ROWS_WRITTEN.labels("content_schedule")
+_CATALOG_ROWS_WRITTEN = _ROWS_WRITTEN.labels("keyword_catalog")
+_REPORT_ROWS_WRITTEN = _ROWS_WRITTEN.labels("traffic_reports")
+_SKETCH_ROWS_WRITTEN = _ROWS_WRITTEN.labels("ranking_sketches")
+
+# Tên span "db.<operation>" dựng một lần cho mỗi thao tác, không phải cho mỗi câu lệnh
+_SPAN_NAMES: Dict[str, str] = {}
+
+_SEARCH_TOKEN = re.compile(r"\w+", re.UNICODE)
+_RANKING_COLUMNS = "keyword, url, position, impressions, clicks, fetched_at"
+
+
+@dataclass(slots=True)
 class KeywordRanking:
     keyword: str
     url: str
@@ -18,7 +48,24 @@ class KeywordRanking:
     fetched_at: str
 
 
-@dataclass
+@dataclass(slots=True)
+class KeywordMovement:
+    keyword: str
+    url: str
+    current_position: float
+    previous_position: Optional[float]
+    # Dương nghĩa là thứ hạng cải thiện (vị trí giảm)
+    delta: Optional[float]
+    fetched_at: str
+
+
+@dataclass(slots=True)
+class KeywordMatch:
+    keyword: str
+    latest: Optional[KeywordRanking] = None
+
+
+@dataclass(slots=True)
 class ScheduledContent:
     id: int
     title: str
@@ -27,7 +74,7 @@ class ScheduledContent:
     status: str
 
 
-@dataclass
+@dataclass(slots=True)
 class TrafficReport:
     id: int
     start_date: str
@@ -37,32 +84,59 @@ class TrafficReport:
     average_position: float
     new_users: int
     returning_users: int
+    generated_at: Optional[str] = None
 
 
 class Database:
     """Simple SQLite wrapper for persisting application data."""
 
-    def __init__(self, db_path: Path | str = ":memory:") -> None:
+    def __init__(
+        self,
+        db_path: Path | str = ":memory:",
+        sketch_segmenter: Callable[[str], str] = url_group,
+        sketch_flush_every: int = 50_000,
+    ) -> None:
         if db_path == ":memory:":
             self.db_path = db_path
         else:
             self.db_path = Path(db_path)
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = sqlite3.connect(self.db_path)
+        # Kết nối được chia sẻ giữa các luồng của bộ lập lịch; _lock tuần tự hóa truy cập
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self._conn.row_factory = sqlite3.Row
+        # lower() của SQLite chỉ xử lý ASCII; phương án LIKE cần hạ chữ hoa tiếng Việt
+        self._conn.create_function("py_lower", 1, _py_lower, deterministic=True)
+        self._lock = RLock()
+        self.fts_enabled = False
+        # Sketch vị trí theo (ngày, nhóm URL) tích lũy trong bộ nhớ cho tới flush_sketches()
+        self.sketch_segmenter = sketch_segmenter
+        self.sketch_flush_every = max(1, sketch_flush_every)
+        self._pending_sketches: Dict[Tuple[str, str], TDigest] = {}
+        self._pending_observations = 0
+        # Ngày có dòng bị ghi đè với giá trị khác: sketch của ngày đó được tính lại khi flush
+        self._dirty_sketch_days: Set[str] = set()
         self._initialise()
 
     def close(self) -> None:
+        self.flush_sketches()
         self._conn.close()
 
     @contextmanager
-    def cursor(self) -> Iterator[sqlite3.Cursor]:
-        cur = self._conn.cursor()
-        try:
-            yield cur
-            self._conn.commit()
-        finally:
-            cur.close()
+    def cursor(self, operation: str = "query") -> Iterator[sqlite3.Cursor]:
+        span_name = _SPAN_NAMES.get(operation)
+        if span_name is None:
+            span_name = _SPAN_NAMES[operation] = f"db.{operation}"
+        with self._lock, span(span_name), _STATEMENT_SECONDS.labels(operation).time():
+            cur = self._conn.cursor()
+            try:
+                yield cur
+                self._conn.commit()
+            except BaseException:
+                # Không để giao dịch dở dang (vd. BEGIN IMMEDIATE) giữ khóa ghi
+                self._conn.rollback()
+                raise
+            finally:
+                cur.close()
 
     def _initialise(self) -> None:
         with self.cursor() as cur:
@@ -79,6 +153,82 @@ class Database:
                 )
                 """
             )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS keyword_latest (
+                    keyword TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    position REAL NOT NULL,
+                    impressions INTEGER NOT NULL,
+                    clicks INTEGER NOT NULL,
+                    fetched_at TEXT NOT NULL
+                )
+                """
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_keyword_latest_position ON keyword_latest (position)")
+            # Trigger giữ keyword_latest đồng bộ với mọi đường ghi vào keyword_rankings
+            cur.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS trg_keyword_rankings_latest
+                AFTER INSERT ON keyword_rankings
+                BEGIN
+                    INSERT INTO keyword_latest (keyword, url, position, impressions, clicks, fetched_at)
+                    VALUES (NEW.keyword, NEW.url, NEW.position, NEW.impressions, NEW.clicks, NEW.fetched_at)
+                    ON CONFLICT (keyword) DO UPDATE SET
+                        url = excluded.url,
+                        position = excluded.position,
+                        impressions = excluded.impressions,
+                        clicks = excluded.clicks,
+                        fetched_at = excluded.fetched_at
+                    WHERE excluded.fetched_at >= keyword_latest.fetched_at;
+                END
+                """
+            )
+            cur.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_keyword_rankings_latest_delete'"
+            )
+            if cur.fetchone() is None:
+                # Bản cũ không có trigger DELETE: bỏ các snapshot không còn dòng lịch sử tương ứng
+                cur.execute(
+                    """
+                    DELETE FROM keyword_latest
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM keyword_rankings r
+                        WHERE r.keyword = keyword_latest.keyword AND r.fetched_at = keyword_latest.fetched_at
+                    )
+                    """
+                )
+            # Xóa dòng đang là snapshot mới nhất: lấy lại dòng mới nhất còn lại (nếu có)
+            cur.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS trg_keyword_rankings_latest_delete
+                AFTER DELETE ON keyword_rankings
+                WHEN OLD.fetched_at = (SELECT fetched_at FROM keyword_latest WHERE keyword = OLD.keyword)
+                BEGIN
+                    DELETE FROM keyword_latest WHERE keyword = OLD.keyword;
+                    INSERT INTO keyword_latest (keyword, url, position, impressions, clicks, fetched_at)
+                    SELECT keyword, url, position, impressions, clicks, fetched_at
+                    FROM keyword_rankings
+                    WHERE keyword = OLD.keyword
+                    ORDER BY fetched_at DESC
+                    LIMIT 1;
+                END
+                """
+            )
+            # Cơ sở dữ liệu cũ: dựng lại bảng snapshot từ lịch sử một lần
+            cur.execute("SELECT EXISTS (SELECT 1 FROM keyword_latest)")
+            if not cur.fetchone()[0]:
+                cur.execute(
+                    """
+                    INSERT INTO keyword_latest (keyword, url, position, impressions, clicks, fetched_at)
+                    SELECT r.keyword, r.url, r.position, r.impressions, r.clicks, r.fetched_at
+                    FROM keyword_rankings r
+                    WHERE r.fetched_at = (
+                        SELECT MAX(fetched_at) FROM keyword_rankings WHERE keyword = r.keyword
+                    )
+                    """
+                )
+            self._initialise_keyword_catalog(cur)
             cur.execute(
                 """
                 CREATE TABLE IF NOT EXISTS content_schedule (
@@ -90,6 +240,10 @@ class Database:
                 )
                 """
             )
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_content_schedule_publish_at ON content_schedule (publish_at)"
+            )
+            self._normalise_publish_times(cur)
             cur.execute(
                 """
                 CREATE TABLE IF NOT EXISTS traffic_reports (
@@ -100,38 +254,504 @@ class Database:
                     total_impressions INTEGER NOT NULL,
                     average_position REAL NOT NULL,
                     new_users INTEGER NOT NULL,
-                    returning_users INTEGER NOT NULL
+                    returning_users INTEGER NOT NULL,
+                    generated_at TEXT
                 )
                 """
             )
+            self._initialise_report_cache(cur)
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ranking_sketches (
+                    day TEXT NOT NULL,
+                    segment TEXT NOT NULL,
+                    sketch BLOB NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (day, segment)
+                ) WITHOUT ROWID
+                """
+            )
+
+    @staticmethod
+    def _normalise_publish_times(cur: sqlite3.Cursor) -> None:
+        # Bản cũ lưu publish_at kèm múi giờ; so sánh chuỗi chỉ đúng khi mọi dòng là UTC không múi giờ
+        cur.execute(
+            """
+            SELECT id, publish_at FROM content_schedule
+            WHERE publish_at GLOB '*[+-][0-9][0-9]:[0-9][0-9]' OR publish_at GLOB '*Z'
+            """
+        )
+        for row in cur.fetchall():
+            try:
+                parsed = datetime.fromisoformat(row["publish_at"].replace("Z", "+00:00"))
+            except ValueError:
+                continue
+            if parsed.tzinfo is None:
+                continue
+            utc = parsed.astimezone(timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds")
+            cur.execute("UPDATE content_schedule SET publish_at = ? WHERE id = ?", (utc, row["id"]))
+
+    def _initialise_report_cache(self, cur: sqlite3.Cursor) -> None:
+        cur.execute("PRAGMA table_info(traffic_reports)")
+        if "generated_at" not in {row["name"] for row in cur.fetchall()}:
+            # Cơ sở dữ liệu cũ: dòng không có generated_at được coi là đã cũ
+            cur.execute("ALTER TABLE traffic_reports ADD COLUMN generated_at TEXT")
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_traffic_reports_range'"
+        )
+        if cur.fetchone() is None:
+            # Bỏ các báo cáo trùng khoảng ngày do generate() cũ sinh ra, giữ bản mới nhất
+            cur.execute(
+                """
+                DELETE FROM traffic_reports
+                WHERE id NOT IN (SELECT MAX(id) FROM traffic_reports GROUP BY start_date, end_date)
+                """
+            )
+            cur.execute(
+                "CREATE UNIQUE INDEX idx_traffic_reports_range ON traffic_reports (start_date, end_date)"
+            )
+
+    def _initialise_keyword_catalog(self, cur: sqlite3.Cursor) -> None:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS keyword_catalog (
+                id INTEGER PRIMARY KEY,
+                keyword TEXT NOT NULL UNIQUE,
+                first_seen TEXT NOT NULL
+            )
+            """
+        )
+        # Từ khóa mới xuất hiện lần đầu trong keyword_latest thì được đưa vào danh mục
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_keyword_latest_catalog
+            AFTER INSERT ON keyword_latest
+            BEGIN
+                INSERT OR IGNORE INTO keyword_catalog (keyword, first_seen)
+                VALUES (NEW.keyword, NEW.fetched_at);
+            END
+            """
+        )
+        cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'keyword_catalog_fts'")
+        fts_existed = cur.fetchone() is not None
+        try:
+            cur.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS keyword_catalog_fts USING fts5(
+                    keyword,
+                    content='keyword_catalog',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+                """
+            )
+        except sqlite3.OperationalError:
+            # SQLite biên dịch không có FTS5: search_keywords quay về LIKE
+            self.fts_enabled = False
+        else:
+            self.fts_enabled = True
+            cur.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS trg_keyword_catalog_fts
+                AFTER INSERT ON keyword_catalog
+                BEGIN
+                    INSERT INTO keyword_catalog_fts (rowid, keyword) VALUES (NEW.id, NEW.keyword);
+                END
+                """
+            )
+            if not fts_existed:
+                # Danh mục có từ trước khi nâng cấp: trigger không lập chỉ mục các dòng cũ
+                cur.execute("INSERT INTO keyword_catalog_fts (keyword_catalog_fts) VALUES ('rebuild')")
+        cur.execute("SELECT EXISTS (SELECT 1 FROM keyword_catalog)")
+        if not cur.fetchone()[0]:
+            cur.execute(
+                """
+                INSERT OR IGNORE INTO keyword_catalog (keyword, first_seen)
+                SELECT keyword, fetched_at FROM keyword_latest ORDER BY fetched_at
+                """
+            )
 
     # Các thao tác xếp hạng từ khóa -------------------------------------------------
     def upsert_keyword_ranking(self, ranking: KeywordRanking) -> None:
-        with self.cursor() as cur:
+        with self.cursor("upsert_keyword_ranking") as cur:
+            cur.execute(
+                "SELECT url, position FROM keyword_rankings WHERE keyword = ? AND fetched_at = ?",
+                (ranking.keyword, ranking.fetched_at),
+            )
+            previous = cur.fetchone()
             cur.execute(
                 """
                 INSERT OR REPLACE INTO keyword_rankings
                 (keyword, url, position, impressions, clicks, fetched_at)
-                VALUES (:keyword, :url, :position, :impressions, :clicks, :fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?)
                 """,
-                ranking.__dict__,
+                (
+                    ranking.keyword,
+                    ranking.url,
+                    ranking.position,
+                    ranking.impressions,
+                    ranking.clicks,
+                    ranking.fetched_at,
+                ),
             )
+            _RANKING_ROWS_WRITTEN.inc(cur.rowcount)
+            if previous is None:
+                self._observe_position(ranking)
+            elif previous["position"] != ranking.position or (
+                self.sketch_segmenter(previous["url"]) != self.sketch_segmenter(ranking.url)
+            ):
+                # Dòng cũ đã nằm trong sketch: không thể gỡ khỏi t-digest, nên tính lại cả ngày
+                self._dirty_sketch_days.add(ranking.fetched_at[:10])
+            flush = self._pending_observations >= self.sketch_flush_every
+        if flush:
+            self.flush_sketches()
 
     def fetch_keyword_rankings(self, keyword: Optional[str] = None) -> List[KeywordRanking]:
-        with self.cursor() as cur:
+        with self.cursor("fetch_keyword_rankings") as cur:
             if keyword:
                 cur.execute(
-                    "SELECT * FROM keyword_rankings WHERE keyword = ? ORDER BY fetched_at DESC",
+                    f"SELECT {_RANKING_COLUMNS} FROM keyword_rankings WHERE keyword = ? ORDER BY fetched_at DESC",
                     (keyword,),
                 )
             else:
-                cur.execute("SELECT * FROM keyword_rankings ORDER BY fetched_at DESC")
+                cur.execute(f"SELECT {_RANKING_COLUMNS} FROM keyword_rankings ORDER BY fetched_at DESC")
+            rows = cur.fetchall()
+        return _rankings_from_rows(rows)
+
+    # Danh mục và tìm kiếm từ khóa ----------------------------------------------------
+    def register_keywords(self, keywords: Iterable[str], seen_at: Optional[str] = None) -> int:
+        """Add discovered keywords to the catalog; returns how many were new."""
+        seen_at = seen_at or datetime.utcnow().isoformat(timespec="seconds")
+        with self.cursor("register_keywords") as cur:
+            cur.executemany(
+                "INSERT OR IGNORE INTO keyword_catalog (keyword, first_seen) VALUES (?, ?)",
+                ((keyword, seen_at) for keyword in keywords),
+            )
+            # rowcount không tính các dòng FTS do trigger chèn
+            added = max(cur.rowcount, 0)
+            _CATALOG_ROWS_WRITTEN.inc(added)
+        return added
+
+    @staticmethod
+    def _fts_query(tokens: List[str], mode: str) -> str:
+        # Token chỉ gồm \w nên không cần thoát dấu nháy; từ cuối luôn khớp tiền tố
+        if mode == "prefix":
+            return '^"' + " ".join(tokens) + '"*'
+        return " ".join(f'"{token}"' for token in tokens) + "*"
+
+    def search_keywords(
+        self,
+        query: str,
+        limit: int = 20,
+        mode: str = "token",
+        with_latest: bool = False,
+    ) -> List[KeywordMatch]:
+        """Search the keyword catalog.
+
+        ``mode="token"`` matches keywords containing every word of ``query``
+        in any order; ``mode="prefix"`` matches keywords starting with
+        ``query``. In both modes the last word may be incomplete, so the
+        API also serves type-ahead. ``with_latest`` joins each match with
+        its ``keyword_latest`` row in the same statement.
+        """
+        if mode not in {"token", "prefix"}:
+            raise ValueError(f"Unknown search mode {mode!r}; expected 'token' or 'prefix'")
+        tokens = _SEARCH_TOKEN.findall(query.lower())
+        if not tokens:
+            return []
+        latest_columns = (
+            ", l.url, l.position, l.impressions, l.clicks, l.fetched_at" if with_latest else ""
+        )
+        latest_join = "LEFT JOIN keyword_latest l ON l.keyword = c.keyword" if with_latest else ""
+        if self.fts_enabled:
+            sql = f"""
+                SELECT c.keyword{latest_columns}
+                FROM keyword_catalog_fts f
+                JOIN keyword_catalog c ON c.id = f.rowid
+                {latest_join}
+                WHERE keyword_catalog_fts MATCH ?
+                ORDER BY f.rank, length(c.keyword), c.keyword
+                LIMIT ?
+            """
+            params: List[object] = [self._fts_query(tokens, mode), limit]
+        else:
+            if mode == "prefix":
+                where = "py_lower(c.keyword) LIKE ? ESCAPE '\\'"
+                params = [_like_escape(query.strip().lower()) + "%"]
+            else:
+                where = " AND ".join("py_lower(c.keyword) LIKE ? ESCAPE '\\'" for _ in tokens)
+                params = ["%" + _like_escape(token) + "%" for token in tokens]
+            sql = f"""
+                SELECT c.keyword{latest_columns}
+                FROM keyword_catalog c
+                {latest_join}
+                WHERE {where}
+                ORDER BY length(c.keyword), c.keyword
+                LIMIT ?
+            """
+            params.append(limit)
+        with self.cursor("search_keywords") as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        matches = []
+        for row in rows:
+            latest = None
+            if with_latest and row["fetched_at"] is not None:
+                latest = KeywordRanking(**dict(row))
+            matches.append(KeywordMatch(row["keyword"], latest))
+        return matches
+
+    # Sketch phân phối vị trí ---------------------------------------------------------
+    def _add_position(self, sketches: Dict[Tuple[str, str], TDigest], day: str, url: str, position: float) -> None:
+        for segment in (ALL_SEGMENTS, self.sketch_segmenter(url)):
+            digest = sketches.get((day, segment))
+            if digest is None:
+                digest = sketches[(day, segment)] = TDigest()
+            digest.add(position)
+
+    def _observe_position(self, ranking: KeywordRanking) -> None:
+        self._add_position(self._pending_sketches, ranking.fetched_at[:10], ranking.url, ranking.position)
+        self._pending_observations += 1
+
+    @staticmethod
+    def _write_sketch(cur: sqlite3.Cursor, day: str, segment: str, digest: TDigest) -> None:
+        cur.execute(
+            "INSERT OR REPLACE INTO ranking_sketches (day, segment, sketch, count) VALUES (?, ?, ?, ?)",
+            (day, segment, digest.to_bytes(), digest.count),
+        )
+
+    def flush_sketches(self) -> int:
+        """Merge in-memory position sketches into ``ranking_sketches``; returns rows written.
+
+        Called automatically every ``sketch_flush_every`` upserts, on
+        ``close()`` and at the end of each crawl batch. Days where an
+        upsert replaced a row with a different position or segment are
+        recomputed from ``keyword_rankings`` instead of merged. Observations
+        not yet flushed are lost if the process dies; ``rebuild_sketches()``
+        recovers them from the stored rankings.
+        """
+        with self._lock:
+            pending, self._pending_sketches = self._pending_sketches, {}
+            dirty, self._dirty_sketch_days = self._dirty_sketch_days, set()
+            self._pending_observations = 0
+            if not pending and not dirty:
+                return 0
+            written = 0
+            with self.cursor("flush_sketches") as cur:
+                for day in sorted(dirty):
+                    rebuilt: Dict[Tuple[str, str], TDigest] = {}
+                    cur.execute(
+                        "SELECT url, position FROM keyword_rankings WHERE substr(fetched_at, 1, 10) = ?",
+                        (day,),
+                    )
+                    for url, position in cur.fetchall():
+                        self._add_position(rebuilt, day, url, position)
+                    cur.execute("DELETE FROM ranking_sketches WHERE day = ?", (day,))
+                    for (_, segment), digest in rebuilt.items():
+                        self._write_sketch(cur, day, segment, digest)
+                    written += len(rebuilt)
+                for (day, segment), digest in pending.items():
+                    if day in dirty:
+                        # Đã được tính lại từ bảng ở trên, gồm cả các quan sát đang chờ
+                        continue
+                    cur.execute(
+                        "SELECT sketch FROM ranking_sketches WHERE day = ? AND segment = ?",
+                        (day, segment),
+                    )
+                    row = cur.fetchone()
+                    if row is not None:
+                        digest.merge(TDigest.from_bytes(row[0]))
+                    self._write_sketch(cur, day, segment, digest)
+                    written += 1
+                _SKETCH_ROWS_WRITTEN.inc(written)
+        return written
+
+    def rebuild_sketches(self) -> int:
+        """Recompute every sketch from ``keyword_rankings``.
+
+        Use after upgrading an existing database or to recover observations
+        lost when the process died before ``flush_sketches()``.
+        """
+        with self._lock:
+            self._pending_sketches = {}
+            self._dirty_sketch_days = set()
+            self._pending_observations = 0
+            with self.cursor("rebuild_sketches") as cur:
+                cur.execute("DELETE FROM ranking_sketches")
+                cur.execute("SELECT keyword, url, position, impressions, clicks, fetched_at FROM keyword_rankings")
+                for row in cur:
+                    self._observe_position(KeywordRanking(*row))
+            return self.flush_sketches()
+
+    def fetch_position_sketch(self, start_day: str, end_day: str, segment: str = ALL_SEGMENTS) -> TDigest:
+        """Merge the stored sketches for ``segment`` over ``start_day``..``end_day`` (inclusive)."""
+        self.flush_sketches()
+        with self.cursor("fetch_position_sketch") as cur:
+            cur.execute(
+                "SELECT sketch FROM ranking_sketches WHERE segment = ? AND day BETWEEN ? AND ?",
+                (segment, start_day, end_day),
+            )
+            rows = cur.fetchall()
+        merged = TDigest()
+        for row in rows:
+            merged.merge(TDigest.from_bytes(row[0]))
+        return merged
+
+    def fetch_sketch_segments(self, start_day: str, end_day: str) -> List[str]:
+        self.flush_sketches()
+        with self.cursor("fetch_sketch_segments") as cur:
+            cur.execute(
+                "SELECT DISTINCT segment FROM ranking_sketches WHERE day BETWEEN ? AND ? ORDER BY segment",
+                (start_day, end_day),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    # Snapshot mới nhất và biến động thứ hạng ----------------------------------------
+    def fetch_latest_rankings(
+        self,
+        limit: Optional[int] = None,
+        max_position: Optional[float] = None,
+    ) -> List[KeywordRanking]:
+        """Current ranking per keyword from ``keyword_latest``, best position first."""
+        query = "SELECT * FROM keyword_latest"
+        params: List[object] = []
+        if max_position is not None:
+            query += " WHERE position <= ?"
+            params.append(max_position)
+        query += " ORDER BY position, keyword"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.cursor("fetch_latest_rankings") as cur:
+            cur.execute(query, params)
             rows = cur.fetchall()
         return [KeywordRanking(**dict(row)) for row in rows]
 
+    @staticmethod
+    def _cutoff(days: int, as_of: Optional[str]) -> str:
+        reference = datetime.fromisoformat(as_of) if as_of else datetime.utcnow()
+        return (reference - timedelta(days=days)).isoformat(timespec="seconds")
+
+    def _fetch_movements(
+        self,
+        operation: str,
+        params: Dict[str, object],
+        latest_where: str = "",
+        movement_where: str = "",
+        order_by: str = "keyword",
+    ) -> List[KeywordMovement]:
+        """Join each ``keyword_latest`` row with its position at ``:cutoff``.
+
+        The previous position is the newest ranking at or before the cutoff,
+        found with one primary-key range lookup per candidate keyword. Only
+        ``latest_where`` narrows the candidates before those lookups: the
+        top-N queries filter on the indexed ``keyword_latest.position``,
+        but gainers, losers and unfiltered deltas filter and sort on the
+        delta, so they do one lookup per tracked keyword before ``LIMIT``:
+        O(tracked keywords) for any window, about 0.5s at 200k keywords.
+
+        Follow-up: dashboards that poll a few fixed windows should read a
+        per-window table (previous position and delta per keyword, indexed
+        on the delta) refreshed at the end of each crawl batch, instead of
+        recomputing every delta here.
+        """
+        query = f"""
+            SELECT * FROM (
+                SELECT
+                    l.keyword,
+                    l.url,
+                    l.position AS current_position,
+                    (
+                        SELECT r.position FROM keyword_rankings r
+                        WHERE r.keyword = l.keyword AND r.fetched_at <= :cutoff
+                        ORDER BY r.fetched_at DESC
+                        LIMIT 1
+                    ) AS previous_position,
+                    l.fetched_at
+                FROM keyword_latest l
+                {latest_where}
+            )
+            {movement_where}
+            ORDER BY {order_by}
+        """
+        if params.get("limit") is not None:
+            query += " LIMIT :limit"
+        with self.cursor(operation) as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        movements = []
+        for row in rows:
+            previous = row["previous_position"]
+            current = row["current_position"]
+            movements.append(
+                KeywordMovement(
+                    keyword=row["keyword"],
+                    url=row["url"],
+                    current_position=current,
+                    previous_position=previous,
+                    delta=None if previous is None else round(previous - current, 4),
+                    fetched_at=row["fetched_at"],
+                )
+            )
+        return movements
+
+    def fetch_position_deltas(
+        self,
+        days: int,
+        as_of: Optional[str] = None,
+        keywords: Optional[List[str]] = None,
+    ) -> List[KeywordMovement]:
+        """Current position versus the position ``days`` before ``as_of`` (default: now)."""
+        params: Dict[str, object] = {"cutoff": self._cutoff(days, as_of)}
+        latest_where = ""
+        if keywords:
+            placeholders = ", ".join(f":k{index}" for index in range(len(keywords)))
+            latest_where = f"WHERE l.keyword IN ({placeholders})"
+            params.update({f"k{index}": keyword for index, keyword in enumerate(keywords)})
+        return self._fetch_movements("fetch_position_deltas", params, latest_where=latest_where)
+
+    def fetch_top_gainers(self, days: int, limit: int = 10, as_of: Optional[str] = None) -> List[KeywordMovement]:
+        """Keywords whose position improved the most over the window."""
+        return self._fetch_movements(
+            "fetch_top_gainers",
+            {"cutoff": self._cutoff(days, as_of), "limit": limit},
+            movement_where="WHERE previous_position > current_position",
+            order_by="previous_position - current_position DESC, keyword",
+        )
+
+    def fetch_top_losers(self, days: int, limit: int = 10, as_of: Optional[str] = None) -> List[KeywordMovement]:
+        """Keywords whose position dropped the most over the window."""
+        return self._fetch_movements(
+            "fetch_top_losers",
+            {"cutoff": self._cutoff(days, as_of), "limit": limit},
+            movement_where="WHERE previous_position < current_position",
+            order_by="current_position - previous_position DESC, keyword",
+        )
+
+    def fetch_top_n_entries(self, n: int, days: int, as_of: Optional[str] = None) -> List[KeywordMovement]:
+        """Keywords now within the top ``n`` that were outside it (or unranked) ``days`` ago."""
+        return self._fetch_movements(
+            "fetch_top_n_entries",
+            {"cutoff": self._cutoff(days, as_of), "n": n},
+            latest_where="WHERE l.position <= :n",
+            movement_where="WHERE previous_position IS NULL OR previous_position > :n",
+            order_by="current_position, keyword",
+        )
+
+    def fetch_top_n_exits(self, n: int, days: int, as_of: Optional[str] = None) -> List[KeywordMovement]:
+        """Keywords that were within the top ``n`` ``days`` ago and have since dropped out."""
+        return self._fetch_movements(
+            "fetch_top_n_exits",
+            {"cutoff": self._cutoff(days, as_of), "n": n},
+            latest_where="WHERE l.position > :n",
+            movement_where="WHERE previous_position <= :n",
+            order_by="previous_position, keyword",
+        )
+
     # Các thao tác bộ lập lịch nội dung ----------------------------------------------
     def add_content(self, title: str, author: str, publish_at: str, status: str) -> int:
-        with self.cursor() as cur:
+        with self.cursor("add_content") as cur:
             cur.execute(
                 """
                 INSERT INTO content_schedule (title, author, publish_at, status)
@@ -139,17 +759,19 @@ class Database:
                 """,
                 (title, author, publish_at, status),
             )
+            _CONTENT_ROWS_WRITTEN.inc(cur.rowcount)
             return int(cur.lastrowid)
 
     def update_content_status(self, content_id: int, status: str) -> None:
-        with self.cursor() as cur:
+        with self.cursor("update_content_status") as cur:
             cur.execute(
                 "UPDATE content_schedule SET status = ? WHERE id = ?",
                 (status, content_id),
             )
+            _CONTENT_ROWS_WRITTEN.inc(cur.rowcount)
 
     def fetch_content(self, status: Optional[str] = None) -> List[ScheduledContent]:
-        with self.cursor() as cur:
+        with self.cursor("fetch_content") as cur:
             if status:
                 cur.execute(
                     "SELECT * FROM content_schedule WHERE status = ? ORDER BY publish_at",
@@ -161,7 +783,7 @@ class Database:
         return [ScheduledContent(**dict(row)) for row in rows]
 
     def fetch_due_content(self, now_iso: str) -> List[ScheduledContent]:
-        with self.cursor() as cur:
+        with self.cursor("fetch_due_content") as cur:
             cur.execute(
                 """
                 SELECT * FROM content_schedule
@@ -173,9 +795,73 @@ class Database:
             rows = cur.fetchall()
         return [ScheduledContent(**dict(row)) for row in rows]
 
+    def fetch_unposted_content(self) -> List[ScheduledContent]:
+        with self.cursor("fetch_unposted_content") as cur:
+            cur.execute(
+                "SELECT * FROM content_schedule WHERE status != 'Posted' ORDER BY publish_at"
+            )
+            rows = cur.fetchall()
+        return [ScheduledContent(**dict(row)) for row in rows]
+
+    def mark_due_content_posted(self, now_iso: str) -> List[ScheduledContent]:
+        """Mark every due entry as ``Posted`` in one transaction and return them."""
+        with self.cursor("mark_due_content_posted") as cur:
+            # BEGIN IMMEDIATE giữ khóa ghi giữa SELECT và UPDATE
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(
+                """
+                SELECT * FROM content_schedule
+                WHERE publish_at <= ? AND status != 'Posted'
+                ORDER BY publish_at
+                """,
+                (now_iso,),
+            )
+            rows = cur.fetchall()
+            if rows:
+                cur.execute(
+                    """
+                    UPDATE content_schedule SET status = 'Posted'
+                    WHERE publish_at <= ? AND status != 'Posted'
+                    """,
+                    (now_iso,),
+                )
+                _CONTENT_ROWS_WRITTEN.inc(cur.rowcount)
+        return [ScheduledContent(**{**dict(row), "status": "Posted"}) for row in rows]
+
+    # Trạng thái cho bộ xuất metrics ---------------------------------------------------
+    def fetch_status(self, now_iso: Optional[str] = None) -> Dict[str, Any]:
+        """Counts and timestamps describing the data left behind by crawl, publish and report runs."""
+        now_iso = now_iso or datetime.utcnow().isoformat(timespec="seconds")
+        with self.cursor("fetch_status") as cur:
+            cur.execute("SELECT COUNT(*), MAX(fetched_at) FROM keyword_latest")
+            tracked_keywords, last_crawled_at = cur.fetchone()
+            cur.execute(
+                """
+                SELECT COUNT(*), COALESCE(SUM(publish_at <= ?), 0)
+                FROM content_schedule WHERE status != 'Posted'
+                """,
+                (now_iso,),
+            )
+            pending_content, overdue_content = cur.fetchone()
+            cur.execute("SELECT MAX(generated_at) FROM traffic_reports")
+            last_report_at = cur.fetchone()[0]
+        return {
+            "tracked_keywords": tracked_keywords,
+            "last_crawled_at": last_crawled_at,
+            "pending_content": pending_content,
+            "overdue_content": overdue_content,
+            "last_report_at": last_report_at,
+        }
+
     # Các thao tác báo cáo ------------------------------------------------------
-    def insert_report(self, report: Dict[str, object]) -> int:
-        with self.cursor() as cur:
+    def upsert_report(self, report: Dict[str, object]) -> int:
+        """Store the report for its ``(start_date, end_date)``, replacing any earlier one.
+
+        ``generated_at`` defaults to now (UTC). Returns the row id, which is
+        stable across refreshes of the same range.
+        """
+        values = {"generated_at": datetime.utcnow().isoformat(timespec="seconds"), **report}
+        with self.cursor("upsert_report") as cur:
             cur.execute(
                 """
                 INSERT INTO traffic_reports (
@@ -185,24 +871,87 @@ class Database:
                     total_impressions,
                     average_position,
                     new_users,
-                    returning_users
+                    returning_users,
+                    generated_at
                 ) VALUES (:start_date, :end_date, :total_clicks, :total_impressions,
-                          :average_position, :new_users, :returning_users)
+                          :average_position, :new_users, :returning_users, :generated_at)
+                ON CONFLICT (start_date, end_date) DO UPDATE SET
+                    total_clicks = excluded.total_clicks,
+                    total_impressions = excluded.total_impressions,
+                    average_position = excluded.average_position,
+                    new_users = excluded.new_users,
+                    returning_users = excluded.returning_users,
+                    generated_at = excluded.generated_at
                 """,
-                report,
+                values,
             )
-            return int(cur.lastrowid)
+            _REPORT_ROWS_WRITTEN.inc(cur.rowcount)
+            cur.execute(
+                "SELECT id FROM traffic_reports WHERE start_date = ? AND end_date = ?",
+                (values["start_date"], values["end_date"]),
+            )
+            return int(cur.fetchone()[0])
+
+    def insert_report(self, report: Dict[str, object]) -> int:
+        """Kept for callers of the old API; reports are unique per range, so this upserts."""
+        return self.upsert_report(report)
+
+    def fetch_report(self, start_date: str, end_date: str) -> Optional[TrafficReport]:
+        with self.cursor("fetch_report") as cur:
+            cur.execute(
+                "SELECT * FROM traffic_reports WHERE start_date = ? AND end_date = ?",
+                (start_date, end_date),
+            )
+            row = cur.fetchone()
+        return TrafficReport(**dict(row)) if row else None
 
     def fetch_reports(self) -> List[TrafficReport]:
-        with self.cursor() as cur:
+        with self.cursor("fetch_reports") as cur:
             cur.execute("SELECT * FROM traffic_reports ORDER BY end_date DESC")
             rows = cur.fetchall()
         return [TrafficReport(**dict(row)) for row in rows]
 
 
+def record_to_dict(record: Any) -> Dict[str, Any]:
+    """Shallow ``dict`` of any dataclass record, for JSON export and ``str.format``.
+
+    Unlike ``dataclasses.asdict`` nested values are not deep-copied.
+    """
+    return {field.name: getattr(record, field.name) for field in fields(record)}
+
+
+def _rankings_from_rows(rows: Sequence[sqlite3.Row]) -> List[KeywordRanking]:
+    # Lịch sử lặp lại cùng keyword/url/fetched_at rất nhiều lần: dùng chung một
+    # đối tượng str cho mỗi giá trị thay vì một bản sao cho mỗi dòng
+    shared: Dict[str, str] = {}
+    share = shared.setdefault
+    return [
+        KeywordRanking(
+            share(keyword, keyword),
+            share(url, url),
+            position,
+            impressions,
+            clicks,
+            share(fetched_at, fetched_at),
+        )
+        for keyword, url, position, impressions, clicks, fetched_at in rows
+    ]
+
+
+def _py_lower(value: Any) -> Any:
+    return value.lower() if isinstance(value, str) else value
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 __all__ = [
     "Database",
+    "KeywordMatch",
+    "KeywordMovement",
     "KeywordRanking",
     "ScheduledContent",
     "TrafficReport",
+    "record_to_dict",
 ]
@@ -0,0 +1,29 @@
+"""Pluggable storage interface for keyword ranking time series.
+
+``Database`` (SQLite) and ``storage.segments.SegmentRankingStore``
+(append-only binary segments) both implement ``RankingStore``, so the
+crawler and the ranking export accept either backend.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Protocol, runtime_checkable
+
+from storage.database import KeywordRanking
+
+
+@runtime_checkable
+class RankingStore(Protocol):
+    def upsert_keyword_ranking(self, ranking: KeywordRanking) -> None:
+        """Store ``ranking``; a later write for the same ``(keyword, fetched_at)`` replaces it."""
+
+    def fetch_keyword_rankings(self, keyword: Optional[str] = None) -> List[KeywordRanking]:
+        """Return rankings newest first, optionally for one keyword."""
+
+    def flush_sketches(self) -> int:
+        """Persist pending position sketches; returns rows written (``0`` if the backend keeps none)."""
+
+    def close(self) -> None:
+        ...
+
+
+__all__ = ["RankingStore"]
@@ -0,0 +1,308 @@
+"""Append-only segment files for high-frequency ranking observations.
+
+``SegmentRankingStore`` keeps one segment file per UTC day. Each record is
+a fixed-width 36-byte struct followed by its own CRC32, so an append never
+rewrites earlier pages (unlike the SQLite B-tree) and a torn tail is easy
+to detect::
+
+    keyword_id u32 | url_id u32 | fetched_at i64 (epoch s) | position f64
+    | impressions u32 | clicks u32 | crc32 u32
+
+Keywords and URLs are stored once in append-only dictionaries and
+referenced by integer ID. Segments are read through ``mmap`` and decoded in
+place. A later record for the same ``(keyword, fetched_at)`` replaces the
+earlier one when read, matching ``Database.upsert_keyword_ranking``.
+
+After an unclean shutdown every segment is re-validated on open and
+truncated at its first invalid record; a clean ``close()`` leaves a marker
+so the next open only checks file sizes.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from calendar import timegm
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from threading import RLock
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+from monitoring.metrics import REGISTRY
+from storage.database import KeywordRanking
+
+
+logger = logging.getLogger(__name__)
+
+_RECORDS_WRITTEN = REGISTRY.counter(
+    "ckt_segment_records_written",
+    "Ranking records appended by SegmentRankingStore.",
+)
+_RECORDS_TRUNCATED = REGISTRY.counter(
+    "ckt_segment_records_truncated",
+    "Invalid or torn segment records dropped during crash recovery.",
+)
+
+MAGIC = b"CKTSEG01"
+HEADER_SIZE = len(MAGIC)
+_BODY = struct.Struct("<IIqdII")
+_RECORD = struct.Struct("<IIqdIII")
+RECORD_SIZE = _RECORD.size  # 32 byte dữ liệu + 4 byte CRC32
+_CLEAN_MARKER = "CLEAN"
+_EPOCH = date(1970, 1, 1)
+_SECONDS_PER_DAY = 86_400
+
+
+def _to_epoch(fetched_at: str) -> int:
+    parsed = datetime.fromisoformat(fetched_at)
+    # Chuỗi không có múi giờ được coi là UTC, như ở phần còn lại của dự án
+    return timegm(parsed.utctimetuple())
+
+
+def _to_iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds")
+
+
+class _Dictionary:
+    """Append-only string <-> integer ID mapping, one JSON string per line."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.values: List[str] = []
+        self.ids: Dict[str, int] = {}
+        if path.exists():
+            raw = path.read_bytes()
+            complete = raw.rfind(b"\n") + 1
+            if complete < len(raw):
+                # Dòng cuối bị ghi dở khi tiến trình dừng đột ngột
+                with path.open("r+b") as f:
+                    f.truncate(complete)
+            for line in raw[:complete].decode("utf-8").splitlines():
+                value = json.loads(line)
+                self.ids[value] = len(self.values)
+                self.values.append(value)
+        self._file = path.open("a", encoding="utf-8")
+
+    def id_for(self, value: str) -> int:
+        ident = self.ids.get(value)
+        if ident is None:
+            ident = len(self.values)
+            self._file.write(json.dumps(value, ensure_ascii=False) + "\n")
+            # Ghi từ điển ra trước bản ghi segment tham chiếu tới ID mới
+            self._file.flush()
+            self.ids[value] = ident
+            self.values.append(value)
+        return ident
+
+    def sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SegmentRankingStore:
+    """``RankingStore`` backed by per-day append-only segment files."""
+
+    def __init__(self, directory: Path | str, max_open_segments: int = 4) -> None:
+        self.directory = Path(directory)
+        self.segment_dir = self.directory / "segments"
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        self.max_open_segments = max(1, max_open_segments)
+        self._lock = RLock()
+        self._writers: "OrderedDict[int, BinaryIO]" = OrderedDict()
+        self.keywords = _Dictionary(self.directory / "keywords.dict")
+        self.urls = _Dictionary(self.directory / "urls.dict")
+        marker = self.directory / _CLEAN_MARKER
+        clean = marker.exists()
+        if clean:
+            marker.unlink()
+        self.recovered_records = self._recover(verify=not clean)
+
+    # Vòng đời ------------------------------------------------------------------
+    def flush(self) -> None:
+        with self._lock:
+            for writer in self._writers.values():
+                writer.flush()
+
+    def sync(self) -> None:
+        """Flush and fsync dictionaries and open segments."""
+        with self._lock:
+            self.keywords.sync()
+            self.urls.sync()
+            for writer in self._writers.values():
+                writer.flush()
+                os.fsync(writer.fileno())
+
+    def flush_sketches(self) -> int:
+        """No-op: segment stores keep no position sketches.
+
+        ``ReportingPipeline.position_distribution`` reads sketches from a
+        ``Database``; load segment data into one to get distributions.
+        """
+        return 0
+
+    def close(self) -> None:
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+            self.keywords.close()
+            self.urls.close()
+            (self.directory / _CLEAN_MARKER).touch()
+
+    def __enter__(self) -> "SegmentRankingStore":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # Phục hồi sau sự cố -----------------------------------------------------------
+    def _recover(self, verify: bool) -> int:
+        dropped = 0
+        for path in self._segment_paths():
+            size = path.stat().st_size
+            valid = self._valid_length(path, size) if verify else self._complete_length(size)
+            if valid < size:
+                lost = (size - valid + RECORD_SIZE - 1) // RECORD_SIZE
+                logger.warning("Truncating %s from %s to %s bytes (%s records)", path.name, size, valid, lost)
+                with path.open("r+b") as f:
+                    f.truncate(valid)
+                dropped += lost
+        _RECORDS_TRUNCATED.inc(dropped)
+        return dropped
+
+    @staticmethod
+    def _complete_length(size: int) -> int:
+        if size < HEADER_SIZE:
+            return 0
+        return HEADER_SIZE + (size - HEADER_SIZE) // RECORD_SIZE * RECORD_SIZE
+
+    def _valid_length(self, path: Path, size: int) -> int:
+        if size < HEADER_SIZE:
+            return 0
+        keyword_count = len(self.keywords.values)
+        url_count = len(self.urls.values)
+        with path.open("rb") as f:
+            if f.read(HEADER_SIZE) != MAGIC:
+                return 0
+            if size == HEADER_SIZE:
+                return size
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offset = HEADER_SIZE
+                end = self._complete_length(size)
+                while offset < end:
+                    keyword_id, url_id, *_, crc = _RECORD.unpack_from(mm, offset)
+                    body_end = offset + _BODY.size
+                    if (
+                        zlib.crc32(mm[offset:body_end]) != crc
+                        or keyword_id >= keyword_count
+                        or url_id >= url_count
+                    ):
+                        return offset
+                    offset += RECORD_SIZE
+        return end
+
+    # Ghi ---------------------------------------------------------------------------
+    def _segment_path(self, day: int) -> Path:
+        return self.segment_dir / f"{(_EPOCH + timedelta(days=day)).isoformat()}.seg"
+
+    def _segment_paths(self) -> List[Path]:
+        return sorted(self.segment_dir.glob("*.seg"))
+
+    def _writer(self, day: int) -> BinaryIO:
+        writer = self._writers.get(day)
+        if writer is not None:
+            self._writers.move_to_end(day)
+            return writer
+        path = self._segment_path(day)
+        writer = path.open("ab")
+        if writer.tell() == 0:
+            writer.write(MAGIC)
+        self._writers[day] = writer
+        if len(self._writers) > self.max_open_segments:
+            _, oldest = self._writers.popitem(last=False)
+            oldest.close()
+        return writer
+
+    def upsert_keyword_ranking(self, ranking: KeywordRanking) -> None:
+        epoch = _to_epoch(ranking.fetched_at)
+        with self._lock:
+            body = _BODY.pack(
+                self.keywords.id_for(ranking.keyword),
+                self.urls.id_for(ranking.url),
+                epoch,
+                ranking.position,
+                ranking.impressions,
+                ranking.clicks,
+            )
+            writer = self._writer(epoch // _SECONDS_PER_DAY)
+            writer.write(body + zlib.crc32(body).to_bytes(4, "little"))
+        _RECORDS_WRITTEN.inc()
+
+    # Đọc ---------------------------------------------------------------------------
+    def _days(self, start: Optional[str], end: Optional[str]) -> List[Path]:
+        paths = self._segment_paths()
+        if start:
+            first = self._segment_path(_to_epoch(start) // _SECONDS_PER_DAY).name
+            paths = [path for path in paths if path.name >= first]
+        if end:
+            last = self._segment_path(_to_epoch(end) // _SECONDS_PER_DAY).name
+            paths = [path for path in paths if path.name <= last]
+        return paths
+
+    def scan(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        keyword: Optional[str] = None,
+    ) -> Iterator[KeywordRanking]:
+        """Yield rankings with ``start <= fetched_at <= end`` in storage order.
+
+        Only the segments for the requested days are mapped. Replaced
+        records are yielded too; ``fetch_keyword_rankings`` resolves them.
+        """
+        self.flush()
+        low = _to_epoch(start) if start else None
+        high = _to_epoch(end) if end else None
+        keyword_id = self.keywords.ids.get(keyword) if keyword is not None else None
+        if keyword is not None and keyword_id is None:
+            return
+        keywords = self.keywords.values
+        urls = self.urls.values
+        timestamps: Dict[int, str] = {}
+        for path in self._days(start, end):
+            with path.open("rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size <= HEADER_SIZE:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for offset in range(HEADER_SIZE, self._complete_length(size), RECORD_SIZE):
+                        kid, url_id, epoch, position, impressions, clicks, _crc = _RECORD.unpack_from(mm, offset)
+                        if keyword_id is not None and kid != keyword_id:
+                            continue
+                        if (low is not None and epoch < low) or (high is not None and epoch > high):
+                            continue
+                        fetched_at = timestamps.get(epoch)
+                        if fetched_at is None:
+                            fetched_at = timestamps[epoch] = _to_iso(epoch)
+                        yield KeywordRanking(keywords[kid], urls[url_id], position, impressions, clicks, fetched_at)
+
+    def fetch_keyword_rankings(self, keyword: Optional[str] = None) -> List[KeywordRanking]:
+        latest: Dict[tuple, KeywordRanking] = {}
+        for ranking in self.scan(keyword=keyword):
+            latest[(ranking.keyword, ranking.fetched_at)] = ranking
+        return sorted(latest.values(), key=lambda ranking: ranking.fetched_at, reverse=True)
+
+    def size_bytes(self) -> int:
+        """Total bytes on disk: dictionaries plus segments."""
+        files = [self.keywords.path, self.urls.path, *self._segment_paths()]
+        return sum(path.stat().st_size for path in files if path.exists())
+
+
+__all__ = ["HEADER_SIZE", "MAGIC", "RECORD_SIZE", "SegmentRankingStore"]
@@ -0,0 +1,191 @@
+"""Mergeable streaming quantile sketches (merging t-digest).
+
+``TDigest`` summarises a stream of values in a bounded number of weighted
+centroids, with the best accuracy near the tails (p1, p99) and typical
+quantile error well under 1% of rank for ``compression=100``. Two
+digests merge losslessly at the centroid level, so per-day sketches can be
+stored once and combined for any date range at query time.
+
+Serialized form (little-endian)::
+
+    version u8 | compression f64 | min f64 | max f64 | count u32
+    | count x (mean f64, weight u32)
+"""
+from __future__ import annotations
+
+import math
+import struct
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+
+ALL_SEGMENTS = "__all__"
+
+_VERSION = 1
+_HEADER = struct.Struct("<BdddI")
+_CENTROID = struct.Struct("<dI")
+
+
+def url_group(url: str) -> str:
+    """Segment key for a ranking URL: its first path component (``/blog``), or ``/``."""
+    path = urlsplit(url).path.strip("/")
+    return "/" + path.split("/", 1)[0] if path else "/"
+
+
+class TDigest:
+    def __init__(self, compression: float = 100.0) -> None:
+        if compression < 10:
+            raise ValueError("compression must be at least 10")
+        self.compression = float(compression)
+        self._means: List[float] = []
+        self._weights: List[int] = []
+        self._buffer: List[Tuple[float, int]] = []
+        self._buffer_limit = int(self.compression * 5)
+        self.min = math.inf
+        self.max = -math.inf
+
+    # Ghi ---------------------------------------------------------------------------
+    def add(self, value: float, weight: int = 1) -> None:
+        if weight <= 0:
+            return
+        self._buffer.append((value, weight))
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+
+    def update(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "TDigest") -> None:
+        other._compress()
+        self._buffer.extend(zip(other._means, other._weights))
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _q_limit(self, q: float) -> float:
+        # Hàm tỉ lệ k1: centroid nhỏ ở hai đuôi, lớn ở giữa phân phối
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        points = sorted([*zip(self._means, self._weights), *self._buffer])
+        self._buffer.clear()
+        total = sum(weight for _, weight in points)
+        means: List[float] = []
+        weights: List[int] = []
+        mean, weight = points[0]
+        before = 0
+        limit = self._q_limit(0.0) * total
+        for value, value_weight in points[1:]:
+            if before + weight + value_weight <= limit:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                before += weight
+                limit = self._q_limit(before / total) * total
+                mean, weight = value, value_weight
+        means.append(mean)
+        weights.append(weight)
+        self._means, self._weights = means, weights
+
+    # Đọc ---------------------------------------------------------------------------
+    @property
+    def count(self) -> int:
+        return sum(self._weights) + sum(weight for _, weight in self._buffer)
+
+    def centroids(self) -> List[Tuple[float, int]]:
+        self._compress()
+        return list(zip(self._means, self._weights))
+
+    def mean(self) -> Optional[float]:
+        self._compress()
+        total = sum(self._weights)
+        if not total:
+            return None
+        return sum(mean * weight for mean, weight in zip(self._means, self._weights)) / total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at rank ``q`` in ``[0, 1]``; ``None`` when empty."""
+        self._compress()
+        if not self._weights:
+            return None
+        if not 0 <= q <= 1:
+            raise ValueError("q must be within [0, 1]")
+        total = sum(self._weights)
+        target = q * total
+        # Mỗi centroid được coi là tập trung quanh tâm của nó; nội suy giữa các tâm
+        cumulative = 0.0
+        previous_mean, previous_center = self.min, 0.0
+        for mean, weight in zip(self._means, self._weights):
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span > 0 else 0.0
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_mean, previous_center = mean, center
+            cumulative += weight
+        span = total - previous_center
+        fraction = (target - previous_center) / span if span > 0 else 1.0
+        return previous_mean + fraction * (self.max - previous_mean)
+
+    def cdf(self, value: float) -> float:
+        """Estimated fraction of observations ``<= value``."""
+        self._compress()
+        if not self._weights:
+            return 0.0
+        if value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+        total = sum(self._weights)
+        points = [(self.min, 0.0)]
+        cumulative = 0.0
+        for mean, weight in zip(self._means, self._weights):
+            points.append((mean, cumulative + weight / 2))
+            cumulative += weight
+        points.append((self.max, float(total)))
+        index = bisect_left(points, (value, math.inf)) - 1
+        (low, low_rank), (high, high_rank) = points[index], points[min(index + 1, len(points) - 1)]
+        if high <= low:
+            return high_rank / total
+        return (low_rank + (value - low) / (high - low) * (high_rank - low_rank)) / total
+
+    def histogram(self, edges: Sequence[float]) -> List[float]:
+        """Estimated counts in ``[edges[i], edges[i + 1])`` for consecutive edges."""
+        total = self.count
+        ranks = [self.cdf(edge - 1e-9) * total for edge in edges]
+        return [max(0.0, high - low) for low, high in zip(ranks, ranks[1:])]
+
+    # Tuần tự hóa -------------------------------------------------------------------
+    def to_bytes(self) -> bytes:
+        self._compress()
+        parts = [_HEADER.pack(_VERSION, self.compression, self.min, self.max, len(self._means))]
+        parts.extend(_CENTROID.pack(mean, weight) for mean, weight in zip(self._means, self._weights))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        version, compression, minimum, maximum, count = _HEADER.unpack_from(data)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported t-digest version {version}")
+        digest = cls(compression)
+        digest.min, digest.max = minimum, maximum
+        for mean, weight in _CENTROID.iter_unpack(data[_HEADER.size : _HEADER.size + count * _CENTROID.size]):
+            digest._means.append(mean)
+            digest._weights.append(weight)
+        return digest
+
+
+__all__ = ["ALL_SEGMENTS", "TDigest", "url_group"]
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from benchmarks.suite import compare, run_suite
+from benchmarks.workloads import generate_keywords
+
+
+def _result(**metrics):
+    return {
+        "metrics": {
+            name: {"name": name, "value": value, "unit": unit, "higher_is_better": unit == "ops/s"}
+            for name, (value, unit) in metrics.items()
+        }
+    }
+
+
+def test_workload_keywords_are_deterministic_and_unique() -> None:
+    first = generate_keywords(500)
+    assert first == generate_keywords(500)
+    assert len(set(first)) == 500
+
+
+def test_compare_flags_regressions_beyond_threshold() -> None:
+    baseline = _result(**{"crawl.keywords_per_s": (1000.0, "ops/s"), "export.rankings_json_s": (2.0, "s")})
+    current = _result(**{"crawl.keywords_per_s": (700.0, "ops/s"), "export.rankings_json_s": (2.1, "s")})
+
+    regressions = compare(current, baseline, threshold=0.2)
+
+    assert [item.name for item in regressions] == ["crawl.keywords_per_s"]
+
+
+def test_compare_ignores_tiny_timing_noise() -> None:
+    baseline = _result(**{"export.reports_s": (0.0002, "s")})
+    current = _result(**{"export.reports_s": (0.0004, "s")})
+
+    assert compare(current, baseline, threshold=0.2) == []
+
+
+def test_run_suite_smoke() -> None:
+    results = run_suite(size=200, years=1)
+
+    metrics = results["metrics"]
+    assert metrics["crawl.keywords_per_s"]["value"] > 0
+    assert metrics["db.upserts_per_s"]["value"] > 0
+    assert metrics["export.rankings_json_peak_mib"]["value"] > 0
+    assert "reporting.generate_1y_s" in metrics
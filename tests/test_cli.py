@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cron chạy các lệnh này hàng nghìn lần mỗi ngày: giữ ngân sách chặt
+IMPORT_BUDGET_S = 0.05
+STARTUP_BUDGET_S = 0.5
+HEAVY_MODULES = ("requests", "bs4", "apscheduler")
+
+_PROBE = """
+import json, sys, time
+began = time.perf_counter()
+from ckt.cli import main
+imported = time.perf_counter()
+code = main(sys.argv[2:])
+finished = time.perf_counter()
+with open(sys.argv[1], "w") as fh:
+    json.dump({
+        "code": code,
+        "import_s": imported - began,
+        "startup_s": finished - began,
+        "heavy": sorted(m for m in %r if m in sys.modules),
+    }, fh)
+""" % (HEAVY_MODULES,)
+
+
+def _probe(tmp_path: Path, *argv: str) -> dict:
+    out = tmp_path / "probe.json"
+    env = {**os.environ, "CKT_DB": str(tmp_path / "ckt.db"), "CKT_CONFIG": str(tmp_path / "missing.json")}
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE, str(out), *argv],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(out.read_text())
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ("crawl", "--rate-limit", "1000", "seo tips", "content marketing"),
+        ("report", "--days", "7"),
+        ("export", "rankings", "--ndjson"),
+        ("publish-due",),
+        ("serve-metrics", "--port", "0", "--duration", "0"),
+    ],
+    ids=lambda argv: argv[0],
+)
+def test_subcommand_startup_budget(tmp_path: Path, argv) -> None:
+    if argv[0] == "export":
+        argv = (*argv, "--out", str(tmp_path / "rankings.ndjson"))
+    result = _probe(tmp_path, *argv)
+
+    assert result["code"] == 0
+    assert result["heavy"] == []
+    assert result["import_s"] < IMPORT_BUDGET_S
+    assert result["startup_s"] < STARTUP_BUDGET_S
+
+
+def test_crawl_then_export_round_trip(tmp_path: Path) -> None:
+    from ckt.cli import main
+
+    db = str(tmp_path / "ckt.db")
+    out = tmp_path / "rankings.json"
+    assert main(["--db", db, "crawl", "--rate-limit", "1000", "seo tips"]) == 0
+    assert main(["--db", db, "export", "rankings", "--out", str(out)]) == 0
+    assert [row["keyword"] for row in json.loads(out.read_text())] == ["seo tips"]
+
+
+def test_work_subcommands_apply_metrics_options(tmp_path: Path) -> None:
+    from ckt.cli import main
+    from monitoring.metrics import REGISTRY
+
+    snapshot = tmp_path / "textfile" / "ckt.prom"
+    REGISTRY.reset()
+    try:
+        argv = ["--db", str(tmp_path / "ckt.db"), "crawl", "--rate-limit", "1000", "seo tips"]
+        assert main([*argv, "--metrics-port", "0", "--metrics-file", str(snapshot)]) == 0
+    finally:
+        REGISTRY.disable()
+        REGISTRY.reset()
+
+    text = snapshot.read_text()
+    assert 'ckt_db_rows_written_total{table="keyword_rankings"} 1' in text
+    assert 'ckt_db_statement_seconds_count{operation="upsert_keyword_ranking"} 1' in text
+
+
+def test_crawl_ingests_and_dedupes_keyword_files(tmp_path: Path, capsys) -> None:
+    from ckt.cli import main
+
+    dump = tmp_path / "dump.csv"
+    dump.write_text("keyword\nSEO Tips\nseo tips\nlink building\n", encoding="utf-8")
+    args = ["--db", str(tmp_path / "ckt.db"), "crawl", "--rate-limit", "1000", "--keywords-file", str(dump)]
+    assert main([*args, "Link  Building"]) == 0
+    assert "Crawled 2/2 keywords (read 4, skipped 2 duplicates and 0 invalid)" in capsys.readouterr().out
+
+
+def test_crawl_with_seen_db_retries_failed_keywords(tmp_path: Path, capsys, monkeypatch) -> None:
+    from ckt.cli import main
+    from integrations.search_console import SearchConsoleClient
+
+    original = SearchConsoleClient.fetch_keyword_metrics
+
+    def flaky(self, keyword):
+        if keyword == "link building":
+            raise ConnectionError("upstream unavailable")
+        return original(self, keyword)
+
+    args = [
+        "--db", str(tmp_path / "ckt.db"), "crawl", "--rate-limit", "1000",
+        "--dedupe", "disk", "--seen-db", str(tmp_path / "seen.db"),
+        "seo tips", "link building",
+    ]
+    monkeypatch.setattr(SearchConsoleClient, "fetch_keyword_metrics", flaky)
+    assert main(args) == 1
+    assert "Crawled 1/2 keywords" in capsys.readouterr().out
+
+    monkeypatch.setattr(SearchConsoleClient, "fetch_keyword_metrics", original)
+    assert main(args) == 0
+    # "seo tips" đã crawl ở lần trước nên bị bỏ qua; "link building" được thử lại
+    assert "Crawled 1/1 keywords (read 2, skipped 1 duplicates and 0 invalid)" in capsys.readouterr().out
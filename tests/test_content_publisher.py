@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scheduler.content_scheduler import ContentPublisher, ContentScheduler
+from storage.database import Database
+
+
+def test_run_due_marks_all_due_posts_in_one_statement() -> None:
+    db = Database()
+    scheduler = ContentScheduler(db)
+    now = datetime.utcnow()
+    first = scheduler.schedule_post("Post 1", "Alice", now - timedelta(hours=2))
+    second = scheduler.schedule_post("Post 2", "Bob", now - timedelta(hours=1))
+    scheduler.schedule_post("Post 3", "Carol", now + timedelta(hours=1))
+
+    posted = scheduler.run_due(now)
+
+    assert [post.id for post in posted] == [first.id, second.id]
+    assert all(post.status == "Posted" for post in posted)
+    assert scheduler.run_due(now) == []
+
+
+def test_publisher_tracks_next_publish_time_from_heap() -> None:
+    db = Database()
+    scheduler = ContentScheduler(db)
+    now = datetime.utcnow().replace(microsecond=0)
+    scheduler.schedule_post("Later", "Alice", now + timedelta(hours=2))
+    publisher = ContentPublisher(scheduler, resync_seconds=None)
+    publisher.load()
+    scheduler.add_listener(publisher._on_scheduled)
+
+    scheduler.schedule_post("Sooner", "Bob", now + timedelta(minutes=5))
+
+    assert publisher.next_publish_at() == now + timedelta(minutes=5)
+    assert publisher.publish_due(now) == []
+    posted = publisher.publish_due(now + timedelta(minutes=5))
+    assert [post.title for post in posted] == ["Sooner"]
+    assert publisher.next_publish_at() == now + timedelta(hours=2)
+
+
+def test_publisher_wakes_at_publish_time() -> None:
+    db = Database()
+    scheduler = ContentScheduler(db)
+    published = threading.Event()
+    posted_at = []
+
+    def on_posted(posts):
+        posted_at.append(datetime.utcnow())
+        published.set()
+
+    publisher = ContentPublisher(scheduler, on_posted=on_posted, resync_seconds=None).start()
+    try:
+        due_at = (datetime.utcnow() + timedelta(seconds=1)).replace(microsecond=0) + timedelta(seconds=1)
+        scheduler.schedule_post("Timed", "Alice", due_at)
+        assert published.wait(timeout=5)
+    finally:
+        publisher.stop()
+
+    assert 0 <= (posted_at[0] - due_at).total_seconds() < 1.0
+    assert [post.status for post in scheduler.list_posts()] == ["Posted"]
+
+
+def test_publisher_survives_errors_while_computing_wait(caplog) -> None:
+    db = Database()
+    scheduler = ContentScheduler(db)
+    published = threading.Event()
+    calls = []
+
+    def flaky_clock() -> datetime:
+        calls.append(None)
+        if len(calls) == 2:
+            raise RuntimeError("clock unavailable")
+        return datetime.utcnow()
+
+    # publish_at có múi giờ so với clock() không múi giờ
+    scheduler.schedule_post("Aware", "Alice", datetime.now(timezone.utc) - timedelta(seconds=1))
+    publisher = ContentPublisher(
+        scheduler, on_posted=lambda posts: published.set(), resync_seconds=None, clock=flaky_clock
+    ).start()
+    try:
+        assert published.wait(timeout=5)
+        assert publisher._thread is not None and publisher._thread.is_alive()
+    finally:
+        publisher.stop()
+    assert "Content publisher iteration failed" in caplog.text
+
+
+def test_failed_mark_due_rolls_back_and_releases_write_lock() -> None:
+    db = Database()
+    scheduler = ContentScheduler(db)
+    now = datetime.utcnow()
+    scheduler.schedule_post("Due", "Alice", now - timedelta(minutes=1))
+
+    # Tham số không bind được: lỗi xảy ra sau BEGIN IMMEDIATE
+    with pytest.raises(sqlite3.Error):
+        db.mark_due_content_posted(object())  # type: ignore[arg-type]
+
+    assert not db._conn.in_transaction
+    assert [post.title for post in scheduler.run_due(now)] == ["Due"]
+
+
+def test_offset_publish_time_is_stored_as_utc_and_published_once() -> None:
+    db = Database()
+    scheduler = ContentScheduler(db)
+    published = threading.Event()
+    transactions = []
+    mark_due = db.mark_due_content_posted
+
+    def counting_mark_due(now_iso: str):
+        transactions.append(now_iso)
+        return mark_due(now_iso)
+
+    db.mark_due_content_posted = counting_mark_due  # type: ignore[method-assign]
+    due_at = datetime.now(timezone(timedelta(hours=7))) - timedelta(seconds=5)
+    post = scheduler.schedule_post("Hà Nội", "Alice", due_at)
+    assert post.publish_at == due_at.astimezone(timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds")
+
+    publisher = ContentPublisher(scheduler, on_posted=lambda posts: published.set(), resync_seconds=None).start()
+    try:
+        assert published.wait(timeout=5)
+        time.sleep(0.5)
+    finally:
+        publisher.stop()
+    assert [row.status for row in scheduler.list_posts()] == ["Posted"]
+    # Không có vòng lặp bận: heap được dọn ngay sau lần xuất bản
+    assert len(transactions) <= 2
+
+
+def test_legacy_offset_publish_times_are_normalised_on_open(tmp_path) -> None:
+    path = tmp_path / "ckt.db"
+    db = Database(path)
+    db.add_content("Legacy", "Bob", "2024-01-01T07:00:00+07:00", "Scheduled")
+    db.close()
+
+    assert [row.publish_at for row in Database(path).fetch_content()] == ["2024-01-01T00:00:00"]
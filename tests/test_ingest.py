@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from crawler.ingest import BloomFilter, DiskSet, KeywordIngestor, normalize_keyword
+
+
+def test_normalize_keyword_folds_case_width_and_whitespace() -> None:
+    assert normalize_keyword("  SEO\tTips 　 2024 ") == "seo tips 2024"
+    assert normalize_keyword("ＳＥＯ") == "seo"
+    assert normalize_keyword("Giày  Chạy Bộ") == normalize_keyword("giày chạy bộ")
+    assert normalize_keyword(" \t ") == ""
+
+
+@pytest.mark.parametrize("dedupe", ["bloom", "disk"])
+def test_ingest_streams_csv_gz_and_ndjson_with_dedupe(tmp_path: Path, dedupe: str) -> None:
+    csv_path = tmp_path / "dump.csv.gz"
+    with gzip.open(csv_path, "wt", encoding="utf-8", newline="") as f:
+        f.write("clicks,keyword\n1,SEO tips\n2,seo  tips\n3,\n4,Link Building\n")
+    ndjson_path = tmp_path / "dump.ndjson"
+    ndjson_path.write_text(
+        "\n".join([json.dumps({"keyword": "link building"}), "{not json", json.dumps("Content Marketing")]) + "\n",
+        encoding="utf-8",
+    )
+
+    with KeywordIngestor(dedupe, capacity=1000) as ingestor:
+        stream = ingestor.ingest_files([csv_path, ndjson_path])
+        assert next(stream) == "seo tips"
+        # Nạp lười: chưa đọc quá từ khóa đầu tiên
+        assert ingestor.stats.input == 1
+        assert list(stream) == ["link building", "content marketing"]
+
+    stats = ingestor.stats
+    assert (stats.input, stats.unique, stats.duplicates, stats.invalid) == (7, 3, 2, 2)
+    assert stats.skipped == 4
+
+
+def test_csv_without_keyword_column_is_rejected(tmp_path: Path) -> None:
+    path = tmp_path / "dump.csv"
+    path.write_text("query\nseo\n", encoding="utf-8")
+    with KeywordIngestor() as ingestor:
+        with pytest.raises(ValueError):
+            list(ingestor.ingest_files([path]))
+        assert list(ingestor.ingest_files([path], column="query")) == ["seo"]
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_error() -> None:
+    bloom = BloomFilter(capacity=20_000, error_rate=0.01)
+    for index in range(20_000):
+        bloom.add(f"kw {index}")
+    assert all(f"kw {index}" in bloom for index in range(20_000))
+    false_positives = sum(f"other {index}" in bloom for index in range(20_000))
+    assert false_positives < 20_000 * 0.02
+
+
+def test_disk_set_persists_across_runs(tmp_path: Path) -> None:
+    seen = DiskSet(tmp_path / "seen.db")
+    assert seen.add("seo tips") and not seen.add("seo tips")
+    assert seen.add("link building")
+    seen.mark_done("seo tips")
+    seen.close()
+    reopened = DiskSet(tmp_path / "seen.db")
+    assert not reopened.add("seo tips")
+    # Chưa được xác nhận ở lần chạy trước: được coi là mới
+    assert reopened.add("link building")
+    reopened.close()
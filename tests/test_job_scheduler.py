@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from scheduler.job_scheduler import JobScheduler
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_registered_jobs_are_grouped_by_class() -> None:
+    scheduler = JobScheduler()
+    scheduler.register_job("crawl_main", lambda: None, 60, job_class="crawl", groups=["nightly"])
+    scheduler.register_job("export_rankings", lambda: None, 60, job_class="export", groups=["nightly"])
+    scheduler.register_job("publish_due", lambda: None, 60, job_class="publish")
+
+    assert scheduler.job_names("crawl") == ["crawl_main"]
+    assert scheduler.job_names("nightly") == ["crawl_main", "export_rankings"]
+    assert scheduler.scheduler.get_job("export_rankings").executor == "export"
+    assert scheduler.scheduler.get_job("crawl_main").max_instances == 1
+
+    with pytest.raises(ValueError):
+        scheduler.register_job("bad", lambda: None, 60, job_class="unknown")
+
+
+def test_pause_and_resume_by_group() -> None:
+    scheduler = JobScheduler()
+    scheduler.start()
+    try:
+        scheduler.register_job("crawl_main", lambda: None, 60, job_class="crawl")
+        scheduler.register_job("report_daily", lambda: None, 60, job_class="report")
+
+        scheduler.pause(group="crawl")
+        assert scheduler.scheduler.get_job("crawl_main").next_run_time is None
+        assert scheduler.scheduler.get_job("report_daily").next_run_time is not None
+
+        scheduler.resume(group="crawl")
+        assert scheduler.scheduler.get_job("crawl_main").next_run_time is not None
+    finally:
+        scheduler.shutdown()
+
+
+def test_overlapping_runs_are_skipped_and_durations_recorded() -> None:
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_crawl() -> None:
+        started.set()
+        release.wait(timeout=5)
+
+    scheduler = JobScheduler()
+    scheduler.start()
+    try:
+        scheduler.register_job("crawl_main", slow_crawl, every_seconds=1, job_class="crawl")
+        assert started.wait(timeout=5)
+        assert _wait_for(lambda: scheduler.stats("crawl_main").skipped_running >= 1)
+        release.set()
+        assert _wait_for(lambda: scheduler.stats("crawl_main").runs >= 1)
+    finally:
+        release.set()
+        scheduler.shutdown(wait=True)
+
+    stats = scheduler.stats("crawl_main")
+    assert stats.last_duration is not None and stats.last_duration > 0.5
+    assert stats.skipped >= 1
+
+
+def test_process_pool_is_created_only_for_process_jobs(monkeypatch) -> None:
+    built = []
+    make_executor = JobScheduler._make_executor
+
+    def recording(job_class):
+        built.append(job_class.name)
+        return make_executor(job_class)
+
+    monkeypatch.setattr(JobScheduler, "_make_executor", staticmethod(recording))
+    scheduler = JobScheduler()
+    scheduler.start()
+    try:
+        scheduler.register_job("crawl_main", lambda: None, 60, job_class="crawl")
+        assert "cpu" not in built
+
+        scheduler.register_job("rebuild", time.monotonic, 60, job_class="cpu", misfire_grace_time=None)
+        scheduler.register_job("rebuild_again", time.monotonic, 60, job_class="cpu")
+        assert built.count("cpu") == 1
+        assert scheduler.scheduler.get_job("rebuild").executor == "cpu"
+        assert scheduler.scheduler.get_job("rebuild").misfire_grace_time is None
+        assert scheduler.scheduler.get_job("rebuild_again").misfire_grace_time == 30
+    finally:
+        scheduler.shutdown()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from storage.database import Database, KeywordRanking
+
+
+def _rank(db: Database, keyword: str, position: float, fetched_at: str) -> None:
+    db.upsert_keyword_ranking(
+        KeywordRanking(keyword, f"https://example.com/{keyword}", position, 100, 10, fetched_at)
+    )
+
+
+def _seed() -> Database:
+    db = Database()
+    history = {
+        "climber": (15.0, 4.0),
+        "faller": (3.0, 18.0),
+        "steady": (6.0, 6.0),
+        "newcomer": (None, 8.0),
+        "slipper": (9.0, 11.0),
+    }
+    for keyword, (before, now) in history.items():
+        if before is not None:
+            _rank(db, keyword, before, "2024-01-01T00:00:00")
+        _rank(db, keyword, now, "2024-01-10T00:00:00")
+    return db
+
+
+def test_latest_table_tracks_newest_snapshot() -> None:
+    db = _seed()
+    # Một bản ghi cũ đến muộn không được ghi đè snapshot mới nhất
+    _rank(db, "climber", 30.0, "2023-12-01T00:00:00")
+
+    latest = {row.keyword: row for row in db.fetch_latest_rankings()}
+    assert latest["climber"].position == 4.0
+    assert latest["climber"].fetched_at == "2024-01-10T00:00:00"
+    assert [row.keyword for row in db.fetch_latest_rankings(limit=2)] == ["climber", "steady"]
+
+
+def test_gainers_losers_and_deltas() -> None:
+    db = _seed()
+    as_of = "2024-01-10T00:00:00"
+
+    gainers = db.fetch_top_gainers(days=7, as_of=as_of)
+    losers = db.fetch_top_losers(days=7, as_of=as_of)
+    deltas = {m.keyword: m.delta for m in db.fetch_position_deltas(days=7, as_of=as_of)}
+
+    assert [(m.keyword, m.delta) for m in gainers] == [("climber", 11.0)]
+    assert [(m.keyword, m.delta) for m in losers] == [("faller", -15.0), ("slipper", -2.0)]
+    assert deltas == {"climber": 11.0, "faller": -15.0, "newcomer": None, "slipper": -2.0, "steady": 0.0}
+
+
+def test_top_n_entries_and_exits() -> None:
+    db = _seed()
+    as_of = "2024-01-10T00:00:00"
+
+    entries = db.fetch_top_n_entries(10, days=7, as_of=as_of)
+    exits = db.fetch_top_n_exits(10, days=7, as_of=as_of)
+
+    assert [m.keyword for m in entries] == ["climber", "newcomer"]
+    assert [m.keyword for m in exits] == ["faller", "slipper"]
+
+
+def test_existing_history_is_backfilled(tmp_path) -> None:
+    path = tmp_path / "ckt.db"
+    db = Database(path)
+    _rank(db, "legacy", 7.0, "2024-01-01T00:00:00")
+    _rank(db, "legacy", 5.0, "2024-01-02T00:00:00")
+    with db.cursor() as cur:
+        cur.execute("DELETE FROM keyword_latest")
+    db.close()
+
+    reopened = Database(path)
+    assert [(row.keyword, row.position) for row in reopened.fetch_latest_rankings()] == [("legacy", 5.0)]
+
+
+def test_deleting_rankings_updates_latest_snapshot() -> None:
+    db = _seed()
+    with db.cursor() as cur:
+        cur.execute("DELETE FROM keyword_rankings WHERE keyword = 'climber' AND fetched_at = '2024-01-10T00:00:00'")
+        cur.execute("DELETE FROM keyword_rankings WHERE keyword = 'newcomer'")
+        # Xóa dòng cũ hơn không đụng tới snapshot
+        cur.execute("DELETE FROM keyword_rankings WHERE keyword = 'faller' AND fetched_at = '2024-01-01T00:00:00'")
+    latest = {row.keyword: (row.position, row.fetched_at) for row in db.fetch_latest_rankings()}
+    assert latest["climber"] == (15.0, "2024-01-01T00:00:00")
+    assert latest["faller"] == (18.0, "2024-01-10T00:00:00")
+    assert "newcomer" not in latest
+
+
+def test_stale_latest_rows_are_dropped_on_upgrade(tmp_path) -> None:
+    path = tmp_path / "ckt.db"
+    db = Database(path)
+    _rank(db, "gone", 3.0, "2024-01-01T00:00:00")
+    _rank(db, "kept", 4.0, "2024-01-01T00:00:00")
+    with db.cursor() as cur:
+        # Mô phỏng cơ sở dữ liệu cũ chưa có trigger DELETE
+        cur.execute("DROP TRIGGER trg_keyword_rankings_latest_delete")
+        cur.execute("DELETE FROM keyword_rankings WHERE keyword = 'gone'")
+    db.close()
+
+    reopened = Database(path)
+    assert [row.keyword for row in reopened.fetch_latest_rankings()] == ["kept"]
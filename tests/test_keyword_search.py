@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import pytest
+
+from storage.database import Database, KeywordRanking
+
+
+def _ranking(keyword: str, position: float = 5.0) -> KeywordRanking:
+    return KeywordRanking(
+        keyword=keyword,
+        url=f"https://example.com/{keyword.replace(' ', '-')}",
+        position=position,
+        impressions=100,
+        clicks=10,
+        fetched_at="2024-06-01T00:00:00",
+    )
+
+
+def _keywords(matches):
+    return sorted(match.keyword for match in matches)
+
+
+def test_crawled_keywords_are_searchable_by_token_and_prefix() -> None:
+    db = Database()
+    for keyword in ["seo pricing", "pricing plans", "how to rank", "how to price seo", "show how to"]:
+        db.upsert_keyword_ranking(_ranking(keyword))
+
+    assert _keywords(db.search_keywords("pricing")) == ["pricing plans", "seo pricing"]
+    assert _keywords(db.search_keywords("pric")) == ["how to price seo", "pricing plans", "seo pricing"]
+    assert _keywords(db.search_keywords("how to", mode="prefix")) == ["how to price seo", "how to rank"]
+    assert _keywords(db.search_keywords("seo how")) == ["how to price seo"]
+    assert db.search_keywords("  ") == []
+    db.close()
+
+
+def test_search_ignores_diacritics_and_joins_latest() -> None:
+    db = Database()
+    db.upsert_keyword_ranking(_ranking("giày chạy bộ", position=3.0))
+    db.register_keywords(["giày da nam"])
+
+    matches = db.search_keywords("giay", with_latest=True)
+    by_keyword = {match.keyword: match.latest for match in matches}
+    assert by_keyword["giày chạy bộ"].position == 3.0
+    assert by_keyword["giày da nam"] is None
+    assert db.register_keywords(["giày da nam", "dép"]) == 1
+    db.close()
+
+
+def test_like_fallback_without_fts() -> None:
+    db = Database()
+    db.register_keywords(["seo pricing", "seo_audit 100%", "pricing plans", "Đà Nẵng Hotel"])
+    db.fts_enabled = False
+    assert _keywords(db.search_keywords("pricing seo")) == ["seo pricing"]
+    assert _keywords(db.search_keywords("seo_", mode="prefix")) == ["seo_audit 100%"]
+    # Không phân biệt hoa thường, kể cả chữ ngoài ASCII, ở cả hai chế độ
+    assert _keywords(db.search_keywords("đà nẵng", mode="prefix")) == ["Đà Nẵng Hotel"]
+    assert _keywords(db.search_keywords("nẵng đà")) == ["Đà Nẵng Hotel"]
+    db.close()
+
+
+def test_catalog_existing_before_fts_is_indexed(tmp_path) -> None:
+    path = tmp_path / "ckt.db"
+    db = Database(path)
+    if not db.fts_enabled:
+        pytest.skip("SQLite built without FTS5")
+    with db.cursor() as cur:
+        # Mô phỏng cơ sở dữ liệu cũ: danh mục có dữ liệu nhưng chưa có bảng FTS
+        cur.execute("DROP TRIGGER trg_keyword_catalog_fts")
+        cur.execute("DROP TABLE keyword_catalog_fts")
+        cur.execute("INSERT INTO keyword_catalog (keyword, first_seen) VALUES ('legacy keyword', '2024-01-01')")
+    db.close()
+
+    reopened = Database(path)
+    assert _keywords(reopened.search_keywords("legacy")) == ["legacy keyword"]
+    reopened.close()
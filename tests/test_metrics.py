@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import time
+import urllib.request
+
+import pytest
+
+from crawler.bot import CrawlerController, KeywordCrawler
+from integrations.search_console import SearchConsoleClient
+from monitoring.metrics import REGISTRY, MetricsRegistry, serve_metrics, write_metrics
+from monitoring.status import register_database_gauges
+from storage.database import Database, KeywordRanking
+
+
+@pytest.fixture
+def enabled_registry():
+    REGISTRY.reset()
+    REGISTRY.enable()
+    yield REGISTRY
+    REGISTRY.disable()
+    REGISTRY.reset()
+
+
+def test_registry_renders_prometheus_text() -> None:
+    registry = MetricsRegistry(enabled=True)
+    registry.counter("jobs", "Jobs run.", ("kind",)).labels("crawl").inc(2)
+    registry.gauge("queue_depth", "Queued items.").set(5)
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    text = registry.render()
+
+    assert '# TYPE jobs counter' in text
+    assert 'jobs_total{kind="crawl"} 2' in text
+    assert "queue_depth 5" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_count 2" in text
+
+
+def test_disabled_registry_records_nothing() -> None:
+    registry = MetricsRegistry(enabled=False)
+    counter = registry.counter("calls", "Calls.")
+    histogram = registry.histogram("call_seconds", "Call latency.")
+    counter.inc()
+    with histogram.time():
+        pass
+
+    assert registry.sample_value("calls_total") == 0
+    assert registry.sample_value("call_seconds_count") == 0
+
+
+def test_disabled_instrumentation_overhead_is_small() -> None:
+    child = MetricsRegistry(enabled=False).histogram("noop_seconds", "No-op.", ("op",)).labels("x")
+    iterations = 100_000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with child.time():
+            pass
+    per_call = (time.perf_counter() - start) / iterations
+    assert per_call < 5e-6
+
+
+def test_crawl_populates_hot_path_metrics(enabled_registry) -> None:
+    db = Database()
+    crawler = KeywordCrawler(SearchConsoleClient("https://example.com"), db, CrawlerController(120))
+
+    crawler.crawl_keywords(["seo tips", "content marketing"])
+
+    assert enabled_registry.sample_value("ckt_crawler_slot_wait_seconds_count") == 2
+    assert enabled_registry.sample_value(
+        "ckt_upstream_request_seconds_count",
+        {"client": "search_console", "method": "fetch_keyword_metrics"},
+    ) == 2
+    assert enabled_registry.sample_value("ckt_db_rows_written_total", {"table": "keyword_rankings"}) == 2
+    assert enabled_registry.sample_value(
+        "ckt_db_statement_seconds_count", {"operation": "upsert_keyword_ranking"}
+    ) == 2
+
+
+def test_metrics_endpoint_serves_registry() -> None:
+    registry = MetricsRegistry()
+    server = serve_metrics(port=0, registry=registry)
+    registry.counter("pings", "Pings.").inc()
+    try:
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as resp:
+            body = resp.read().decode("utf-8")
+    finally:
+        server.stop()
+
+    assert "pings_total 1" in body
+
+
+def test_database_gauges_refresh_on_every_render(tmp_path) -> None:
+    db = Database()
+    registry = MetricsRegistry(enabled=True)
+    register_database_gauges(db, registry)
+    assert registry.sample_value("ckt_keywords_tracked") == 0
+
+    db.upsert_keyword_ranking(KeywordRanking("seo tips", "https://example.com/seo", 4.0, 100, 10, "2024-05-01T06:00:00"))
+    db.add_content("Old", "an", "2000-01-01T00:00:00", "Scheduled")
+    db.add_content("New", "an", "2999-01-01T00:00:00", "Scheduled")
+    text = write_metrics(tmp_path / "textfile" / "ckt.prom", registry).read_text()
+
+    assert "ckt_keywords_tracked 1" in text
+    assert "ckt_last_crawl_timestamp_seconds 1714543200" in text
+    assert 'ckt_content_pending{state="overdue"} 1' in text
+    assert 'ckt_content_pending{state="waiting"} 1' in text
+    assert "ckt_last_report_timestamp_seconds 0" in text
+    assert not (tmp_path / "textfile" / "ckt.prom.tmp").exists()
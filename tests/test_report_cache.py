@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from integrations.ga4 import GA4Client
+from integrations.search_console import SearchConsoleClient
+from reporting.pipeline import ReportingPipeline
+from storage.database import Database
+
+
+class _CountingSearchConsole(SearchConsoleClient):
+    def __init__(self) -> None:
+        super().__init__("https://example.com")
+        self.calls = 0
+
+    def fetch_query_metrics(self, start, end):
+        self.calls += 1
+        return super().fetch_query_metrics(start, end)
+
+
+class _Clock:
+    def __init__(self, now: datetime) -> None:
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def _pipeline(db: Database, clock: _Clock) -> tuple[ReportingPipeline, _CountingSearchConsole]:
+    sc_client = _CountingSearchConsole()
+    pipeline = ReportingPipeline(
+        GA4Client("GA4-TEST"), sc_client, db, open_window_days=3, stale_after_seconds=3600, clock=clock
+    )
+    return pipeline, sc_client
+
+
+def test_closed_range_is_generated_once_and_served_from_storage() -> None:
+    db = Database()
+    pipeline, sc_client = _pipeline(db, _Clock(datetime(2024, 6, 30, 12)))
+
+    first = pipeline.generate(date(2024, 6, 1), date(2024, 6, 7))
+    second = pipeline.generate(date(2024, 6, 1), date(2024, 6, 7))
+
+    assert sc_client.calls == 1
+    assert (first.cached, second.cached) == (False, True)
+    assert second.report_id == first.report_id
+    assert second.total_clicks == first.total_clicks
+    assert pipeline.cache_stats.hit_rate == 0.5
+
+    forced = pipeline.generate(date(2024, 6, 1), date(2024, 6, 7), force=True)
+    assert sc_client.calls == 2 and forced.report_id == first.report_id
+    assert len(db.fetch_reports()) == 1
+
+
+def test_open_range_is_refreshed_after_staleness_window_and_once_closed() -> None:
+    db = Database()
+    clock = _Clock(datetime(2024, 6, 30, 12))
+    pipeline, sc_client = _pipeline(db, clock)
+    start, end = date(2024, 6, 24), date(2024, 6, 29)
+
+    pipeline.generate(start, end)
+    clock.now += timedelta(minutes=30)
+    assert pipeline.generate(start, end).cached
+    clock.now += timedelta(minutes=31)
+    assert not pipeline.generate(start, end).cached
+    assert sc_client.calls == 2
+
+    # Sau khi khoảng ngày đóng: tính lại đúng một lần rồi phục vụ từ bộ nhớ đệm mãi mãi
+    clock.now = datetime(2024, 7, 3, 0, 5)
+    assert not pipeline.generate(start, end).cached
+    clock.now += timedelta(days=30)
+    assert pipeline.generate(start, end).cached
+    assert sc_client.calls == 3
+    assert len(db.fetch_reports()) == 1
+
+
+def test_existing_duplicate_reports_are_collapsed_on_open(tmp_path: Path) -> None:
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE traffic_reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            total_clicks INTEGER NOT NULL,
+            total_impressions INTEGER NOT NULL,
+            average_position REAL NOT NULL,
+            new_users INTEGER NOT NULL,
+            returning_users INTEGER NOT NULL
+        )
+        """
+    )
+    for clicks in (10, 20, 30):
+        conn.execute(
+            "INSERT INTO traffic_reports VALUES (NULL, '2024-01-01', '2024-01-07', ?, 100, 5.0, 1, 1)",
+            (clicks,),
+        )
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    reports = db.fetch_reports()
+    assert [(report.total_clicks, report.generated_at) for report in reports] == [(30, None)]
+
+    pipeline, sc_client = _pipeline(db, _Clock(datetime(2024, 6, 30)))
+    # Dòng cũ không có generated_at: tính lại một lần, giữ nguyên id
+    refreshed = pipeline.generate(date(2024, 1, 1), date(2024, 1, 7))
+    assert not refreshed.cached and refreshed.report_id == reports[0].id
+    assert sc_client.calls == 1
+    db.close()
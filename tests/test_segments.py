@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from reporting.export import export_keyword_rankings
+from storage.database import Database, KeywordRanking
+from storage.rankings import RankingStore
+from storage.segments import HEADER_SIZE, RECORD_SIZE, SegmentRankingStore
+
+
+def _ranking(keyword: str, position: float, fetched_at: str) -> KeywordRanking:
+    return KeywordRanking(keyword, f"https://example.com/{keyword}", position, 100, 10, fetched_at)
+
+
+def _segment(store_dir: Path, day: str) -> Path:
+    return store_dir / "segments" / f"{day}.seg"
+
+
+def test_both_backends_implement_ranking_store(tmp_path: Path) -> None:
+    with SegmentRankingStore(tmp_path / "store") as store:
+        assert isinstance(store, RankingStore)
+        assert store.flush_sketches() == 0
+    assert isinstance(Database(), RankingStore)
+
+
+def test_round_trip_replaces_and_filters_like_database(tmp_path: Path) -> None:
+    store = SegmentRankingStore(tmp_path / "store")
+    db = Database()
+    rows = [
+        _ranking("seo tips", 5.0, "2024-01-01T08:00:00"),
+        _ranking("seo tips", 4.0, "2024-01-02T08:00:00"),
+        _ranking("link building", 9.0, "2024-01-02T09:30:00"),
+        # Cùng (keyword, fetched_at): bản ghi sau thay thế bản ghi trước
+        _ranking("seo tips", 3.0, "2024-01-02T08:00:00"),
+    ]
+    for row in rows:
+        store.upsert_keyword_ranking(row)
+        db.upsert_keyword_ranking(row)
+
+    assert store.fetch_keyword_rankings() == db.fetch_keyword_rankings()
+    assert store.fetch_keyword_rankings("seo tips") == db.fetch_keyword_rankings("seo tips")
+    assert store.fetch_keyword_rankings("unknown") == []
+    assert [row.keyword for row in store.scan(start="2024-01-02T09:00:00")] == ["link building"]
+    store.close()
+
+    reopened = SegmentRankingStore(tmp_path / "store")
+    assert reopened.recovered_records == 0
+    assert reopened.fetch_keyword_rankings() == db.fetch_keyword_rankings()
+    out = export_keyword_rankings(reopened, tmp_path / "rankings.json")
+    assert [row["position"] for row in json.loads(out.read_text(encoding="utf-8"))] == [9.0, 3.0, 5.0]
+    reopened.close()
+
+
+def test_unclean_shutdown_truncates_at_first_invalid_record(tmp_path: Path) -> None:
+    store_dir = tmp_path / "store"
+    store = SegmentRankingStore(store_dir)
+    for index in range(5):
+        store.upsert_keyword_ranking(_ranking(f"kw{index}", index + 1.0, f"2024-03-01T00:00:0{index}"))
+    store.flush()  # không gọi close(): mô phỏng tiến trình bị dừng đột ngột
+
+    segment = _segment(store_dir, "2024-03-01")
+    data = bytearray(segment.read_bytes())
+    assert len(data) == HEADER_SIZE + 5 * RECORD_SIZE
+    # Hỏng một byte trong bản ghi thứ tư và thêm nửa bản ghi ở cuối
+    data[HEADER_SIZE + 3 * RECORD_SIZE + 12] ^= 0xFF
+    data += b"\x00" * (RECORD_SIZE // 2)
+    segment.write_bytes(bytes(data))
+
+    recovered = SegmentRankingStore(store_dir)
+    assert recovered.recovered_records == 3
+    assert segment.stat().st_size == HEADER_SIZE + 3 * RECORD_SIZE
+    assert sorted(row.keyword for row in recovered.fetch_keyword_rankings()) == ["kw0", "kw1", "kw2"]
+    recovered.upsert_keyword_ranking(_ranking("kw9", 1.0, "2024-03-01T12:00:00"))
+    assert len(recovered.fetch_keyword_rankings()) == 4
+    recovered.close()
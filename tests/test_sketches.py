@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import random
+from datetime import date
+
+from integrations.ga4 import GA4Client
+from integrations.search_console import SearchConsoleClient
+from reporting.pipeline import ReportingPipeline
+from storage.database import Database, KeywordRanking
+from storage.sketches import ALL_SEGMENTS, TDigest, url_group
+
+
+def _exact_quantile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def test_merged_serialized_digests_match_exact_quantiles() -> None:
+    rng = random.Random(7)
+    values = [min(100.0, max(1.0, rng.lognormvariate(2.5, 0.8))) for _ in range(50_000)]
+    parts = [TDigest() for _ in range(7)]
+    for index, value in enumerate(values):
+        parts[index % 7].add(value)
+
+    merged = TDigest()
+    for part in parts:
+        merged.merge(TDigest.from_bytes(part.to_bytes()))
+
+    assert merged.count == len(values)
+    assert len(merged.to_bytes()) < 2_000
+    assert (merged.min, merged.max) == (min(values), max(values))
+    for q in (0.01, 0.5, 0.9, 0.99):
+        exact = _exact_quantile(values, q)
+        assert abs(merged.quantile(q) - exact) <= 0.02 * exact
+    # Sai số hạng của histogram nhỏ hơn 1% tổng số
+    edges = [1.0, 4.0, 11.0, 21.0, 51.0, 101.0]
+    exact_counts = [sum(low <= value < high for value in values) for low, high in zip(edges, edges[1:])]
+    for estimated, exact in zip(merged.histogram(edges), exact_counts):
+        assert abs(estimated - exact) < 0.01 * len(values)
+
+
+def test_url_group() -> None:
+    assert url_group("https://example.com/blog/seo-tips") == "/blog"
+    assert url_group("https://example.com/") == "/"
+    assert url_group("https://example.com/pricing") == "/pricing"
+
+
+def test_crawl_writes_sketches_queried_by_pipeline_per_segment() -> None:
+    db = Database()
+    for day, offset in (("2024-05-01", 0.0), ("2024-05-02", 0.25)):
+        for index in range(1, 101):
+            section = "blog" if index % 2 else "docs"
+            db.upsert_keyword_ranking(
+                KeywordRanking(
+                    f"kw {index}",
+                    f"https://example.com/{section}/{index}",
+                    float(index) + offset,
+                    100,
+                    10,
+                    f"{day}T06:00:00",
+                )
+            )
+    pipeline = ReportingPipeline(GA4Client("GA4-TEST"), SearchConsoleClient("https://example.com"), db)
+
+    assert db.fetch_sketch_segments("2024-05-01", "2024-05-02") == ["/blog", "/docs", ALL_SEGMENTS]
+    one_day = pipeline.position_distribution(date(2024, 5, 1), date(2024, 5, 1), quantiles=(0.5,))
+    assert one_day.count == 100
+    assert abs(one_day.quantiles[0.5] - 50.5) < 1.0
+    assert abs(one_day.mean_position - 50.5) < 1e-6
+
+    both_days = pipeline.position_distribution(date(2024, 5, 1), date(2024, 5, 2), segment="/blog")
+    assert both_days.count == 100
+    assert round(sum(count for _, _, count in both_days.histogram)) == 100
+
+    db.rebuild_sketches()
+    rebuilt = pipeline.position_distribution(date(2024, 5, 1), date(2024, 5, 2), segment="/blog")
+    assert rebuilt.count == 100
+    assert rebuilt.quantiles == both_days.quantiles
+    assert pipeline.position_distribution(date(2023, 1, 1), date(2023, 1, 2)).count == 0
+
+
+def test_reupserted_ranking_is_counted_once() -> None:
+    db = Database(sketch_flush_every=1)
+    ranking = KeywordRanking("seo tips", "https://example.com/blog/seo", 4.0, 100, 10, "2024-05-01T06:00:00")
+    db.upsert_keyword_ranking(ranking)
+    db.upsert_keyword_ranking(ranking)
+    assert len(db.fetch_keyword_rankings()) == 1
+    assert db.fetch_position_sketch("2024-05-01", "2024-05-01").count == 1
+
+    # Ghi đè với vị trí và nhóm URL khác: sketch của ngày được tính lại, không cộng dồn
+    db.upsert_keyword_ranking(
+        KeywordRanking("other", "https://example.com/docs/x", 9.0, 10, 1, "2024-05-01T07:00:00")
+    )
+    db.upsert_keyword_ranking(
+        KeywordRanking("seo tips", "https://example.com/docs/seo", 2.0, 100, 10, "2024-05-01T06:00:00")
+    )
+    merged = db.fetch_position_sketch("2024-05-01", "2024-05-01")
+    assert (merged.count, merged.min, merged.max) == (2, 2.0, 9.0)
+    assert db.fetch_position_sketch("2024-05-01", "2024-05-01", segment="/blog").count == 0
+    assert db.fetch_position_sketch("2024-05-01", "2024-05-01", segment="/docs").count == 2
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from benchmarks.load_test import run_load_test
+from integrations.ga4 import GA4Client
+from integrations.http_clients import HttpGA4Client, HttpSearchConsoleClient, UpstreamError
+from integrations.search_console import SearchConsoleClient
+from integrations.stand_in import LatencyModel, StandInConfig, StandInServer
+
+SITE = "https://example.com"
+
+
+def _strip_fetched_at(payload):
+    return {key: value for key, value in payload.items() if key != "fetched_at"}
+
+
+def test_http_clients_match_in_process_mocks() -> None:
+    with StandInServer() as server:
+        sc = HttpSearchConsoleClient(SITE, server.base_url, page_size=7)
+        ga = HttpGA4Client("GA4-TEST", server.base_url, page_size=5)
+        start, end = date(2024, 1, 1), date(2024, 1, 31)
+
+        assert _strip_fetched_at(sc.fetch_keyword_metrics("seo tips")) == _strip_fetched_at(
+            SearchConsoleClient(SITE).fetch_keyword_metrics("seo tips")
+        )
+        assert sc.fetch_query_metrics(start, end) == SearchConsoleClient(SITE).fetch_query_metrics(start, end)
+        assert ga.fetch_traffic_metrics(start, end) == GA4Client("GA4-TEST").fetch_traffic_metrics(start, end)
+        # Search Console: 31 ngày / trang 7 dòng => 5 trang + 1 trang rỗng; GA4 dừng theo rowCount
+        assert server.stats["status_200"] == 1 + 6 + 7
+
+
+def test_search_console_pages_past_server_row_cap() -> None:
+    config = StandInConfig(max_page_size=100)
+    with StandInServer(config) as server:
+        # page_size mặc định 25 000 lớn hơn giới hạn rowLimit của máy chủ
+        sc = HttpSearchConsoleClient(SITE, server.base_url)
+        ga = HttpGA4Client("GA4-TEST", server.base_url)
+        start, end = date(2024, 1, 1), date(2024, 12, 30)
+
+        assert sc.fetch_query_metrics(start, end) == SearchConsoleClient(SITE).fetch_query_metrics(start, end)
+        assert len(ga.fetch_traffic_metrics(start, end)) == 365
+
+
+def test_client_retries_injected_errors() -> None:
+    config = StandInConfig(error_rate_5xx=0.5, seed=3)
+    with StandInServer(config) as server:
+        client = HttpSearchConsoleClient(SITE, server.base_url, max_retries=10, backoff_factor=0.001)
+        for index in range(20):
+            assert client.fetch_keyword_metrics(f"kw {index}")["keyword"] == f"kw {index}"
+
+    assert server.stats["status_200"] == 20
+    assert server.stats["status_500"] + server.stats["status_503"] > 0
+
+
+def test_quota_exhaustion_surfaces_429() -> None:
+    with StandInServer(StandInConfig(quota_per_minute=2)) as server:
+        client = HttpSearchConsoleClient(SITE, server.base_url, max_retries=0)
+        client.fetch_keyword_metrics("a")
+        client.fetch_keyword_metrics("b")
+        with pytest.raises(UpstreamError) as excinfo:
+            client.fetch_keyword_metrics("c")
+
+    assert excinfo.value.status_code == 429
+
+
+def test_latency_model_parsing() -> None:
+    model = LatencyModel.parse("lognormal:40:0.5")
+    assert (model.kind, model.a, model.b) == ("lognormal", 40.0, 0.5)
+    with pytest.raises(ValueError):
+        LatencyModel.parse("gaussian:1")
+
+
+def test_load_test_crawls_every_keyword_concurrently() -> None:
+    config = StandInConfig(latency=LatencyModel("fixed", 2), error_rate_5xx=0.05, seed=1)
+    result = run_load_test(keywords=200, workers=8, config=config, reports=2, report_days=30)
+
+    assert result["keywords_crawled"] == 200
+    assert result["server"]["status_500"] + result["server"]["status_503"] > 0
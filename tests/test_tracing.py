@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+import time
+
+import pytest
+
+from crawler.bot import CrawlerController, KeywordCrawler
+from integrations.search_console import SearchConsoleClient
+from monitoring.tracing import TRACER, SamplingProfiler, Tracer, span
+from storage.database import Database
+
+
+@pytest.fixture
+def tracing_enabled():
+    TRACER.clear()
+    TRACER.enabled = True
+    yield TRACER
+    TRACER.enabled = False
+    TRACER.clear()
+
+
+def test_disabled_tracer_records_nothing() -> None:
+    tracer = Tracer(enabled=False)
+    with tracer.span("noop") as sp:
+        sp.set("ignored", True)
+    assert tracer.spans() == []
+
+
+def test_ring_buffer_keeps_latest_spans() -> None:
+    tracer = Tracer(enabled=True, ring_size=3)
+    for index in range(5):
+        with tracer.span("step", index=index):
+            pass
+    assert [record.attrs["index"] for record in tracer.spans()] == [2, 3, 4]
+
+
+def test_crawl_records_nested_spans(tracing_enabled, tmp_path) -> None:
+    crawler = KeywordCrawler(SearchConsoleClient("https://example.com"), Database(), CrawlerController(120))
+
+    crawler.crawl_keywords(["seo tips"])
+
+    records = {record.name: record for record in tracing_enabled.spans()}
+    assert records["crawl.batch"].depth == 0
+    assert records["crawl.keyword"].parent == "crawl.batch"
+    assert records["crawl.fetch"].parent == "crawl.keyword"
+    assert records["db.upsert_keyword_ranking"].parent == "crawl.upsert"
+    assert records["crawl.keyword"].attrs == {"keyword": "seo tips"}
+
+    path = tracing_enabled.flush(tmp_path / "trace.json")
+    events = json.loads(path.read_text())["traceEvents"]
+    assert {event["ph"] for event in events} == {"X"}
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path) -> None:
+    def busy_wait() -> None:
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+
+    output = tmp_path / "profile.collapsed"
+    with SamplingProfiler(interval=0.001, output=output):
+        busy_wait()
+
+    lines = output.read_text().splitlines()
+    assert lines
+    assert any("busy_wait" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_module_span_is_shared_noop_when_disabled() -> None:
+    assert not TRACER.enabled
+    assert span("a") is span("b")
@@ -8,7 +8,7 @@ from integrations.ga4 import GA4Client
 from integrations.search_console import SearchConsoleClient
 from reporting.pipeline import ReportingPipeline
 from scheduler.content_scheduler import ContentScheduler
-from storage.database import Database
+from storage.database import Database, record_to_dict
 
 
 def test_keyword_crawler_persists_rankings() -> None:
@@ -26,6 +26,21 @@ def test_keyword_crawler_persists_rankings() -> None:
     assert all(row.impressions >= row.clicks for row in stored)
 
 
+def test_iter_crawl_streams_persisted_slotted_records() -> None:
+    db = Database()
+    crawler = KeywordCrawler(SearchConsoleClient("https://example.com"), db, CrawlerController(10**6))
+    stream = crawler.iter_crawl(iter(["seo tips", "content marketing", "link building"]))
+
+    first = next(stream)
+    # Bản ghi được lưu trước khi được trả về
+    assert [row.keyword for row in db.fetch_keyword_rankings()] == [first.keyword]
+    assert not hasattr(first, "__dict__")
+    rest = list(stream)
+    assert len(rest) == 2
+    history = db.fetch_keyword_rankings()
+    assert len({id(row.fetched_at) for row in history}) == len({row.fetched_at for row in history})
+
+
 def test_content_scheduler_marks_due_posts() -> None:
     db = Database()
     scheduler = ContentScheduler(db)
@@ -56,3 +71,19 @@ def test_reporting_pipeline_generates_summary() -> None:
     assert summary.total_impressions >= summary.total_clicks
     assert summary.new_users >= 0
     assert len(pipeline.list_reports()) == 1
+
+
+def test_record_to_dict_handles_every_exported_record_type() -> None:
+    db = Database()
+    crawler = KeywordCrawler(SearchConsoleClient("https://example.com"), db, CrawlerController(10**6))
+    ranking = crawler.crawl_keywords(["seo tips"])[0]
+    db.add_content("Post", "An", "2024-01-01T00:00:00", "Draft")
+    content = db.fetch_content()[0]
+    pipeline = ReportingPipeline(GA4Client("GA4-TEST"), SearchConsoleClient("https://example.com"), db)
+    summary = pipeline.generate(date(2024, 1, 1), date(2024, 1, 7))
+    report = db.fetch_reports()[0]
+
+    for record in (ranking, content, report, summary):
+        assert set(record_to_dict(record)) == set(type(record).__dataclass_fields__)
+    # Dùng được với str.format như trong demo.py
+    assert "{start_date}/{total_clicks}".format(**record_to_dict(summary)) == f"2024-01-01/{summary.total_clicks}"